@@ -0,0 +1,232 @@
+# Description: Timing benchmarks for the Hash Map implementations. Each benchmark prints its
+# measurements in the same format as the BASIC TESTING sections of the hash map modules.
+# Run with: python benchmark.py
+
+
+import asyncio
+import io
+import os
+import tempfile
+from time import perf_counter
+
+import hash_map_durable
+import hash_map_oa
+import hash_map_rh
+import hash_map_sc
+import hash_map_server
+import hash_map_sharded
+from datastructures import hash_function_2
+
+
+def bench_sc_remove(capacities: tuple = (1_009, 100_003, 1_000_003), count: int = 2_000) -> None:
+    """
+    Times removing the same number of keys from separate chaining maps of increasing capacity.
+    remove() only scans the bucket the key hashes to, so the time per delete should stay
+    flat as the capacity grows.
+    """
+    for capacity in capacities:
+        m = hash_map_sc.HashMap(capacity, hash_function_2)
+        keys = ['key' + str(i) for i in range(count)]
+        for key in keys:
+            m.put(key, key)
+
+        start = perf_counter()
+        for key in keys:
+            m.remove(key)
+        elapsed = perf_counter() - start
+        print(capacity, m.get_size(), f"{elapsed / count * 1e6:.2f} us/remove")
+
+
+def bench_bulk_put(count: int = 5_000) -> None:
+    """
+    Times loading the same pairs into both maps with put() per pair and with a single put_many().
+    """
+    pairs = [('key' + str(i), i) for i in range(count)]
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(11, hash_function_2)
+        start = perf_counter()
+        for key, value in pairs:
+            m.put(key, value)
+        per_key = perf_counter() - start
+
+        m = module.HashMap(11, hash_function_2)
+        start = perf_counter()
+        m.put_many(pairs)
+        bulk = perf_counter() - start
+        print(module.__name__, m.get_size(), m.get_capacity(), f"put: {per_key:.2f}s put_many: {bulk:.2f}s")
+
+
+def bench_open_addressing_lookup(count: int = 5_000) -> None:
+    """
+    Compares capacity and lookup time of the quadratic probing and Robin Hood maps after
+    the same churn of insertions and removals.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    for module in (hash_map_oa, hash_map_rh):
+        m = module.HashMap(11, hash_function_2)
+        for batch in range(3):
+            for key in keys:
+                m.put(key + str(batch), batch)
+            if batch < 2:
+                m.remove_many(key + str(batch) for key in keys)
+
+        start = perf_counter()
+        for key in keys:
+            m.get(key + '2')
+            m.get(key + '9')
+        elapsed = perf_counter() - start
+        print(module.__name__, m.get_size(), m.get_capacity(), round(m.table_load(), 2),
+              f"{elapsed / (2 * count) * 1e6:.2f} us/get")
+
+
+def bench_sc_colliding_keys(count: int = 20_000) -> None:
+    """
+    Times lookups in a separate chaining map where every key hashes to the same bucket.
+    The bucket is kept sorted by (hash, key), so each lookup is a binary search.
+    """
+    m = hash_map_sc.HashMap(11, lambda key: 0)
+    keys = ['key' + str(i) for i in range(count)]
+    m.put_many((key, key) for key in keys)
+
+    start = perf_counter()
+    for key in keys:
+        m.get(key)
+    elapsed = perf_counter() - start
+    print(m.get_size(), m.empty_buckets(), f"{elapsed / count * 1e6:.2f} us/get")
+
+
+def bench_sharded_bulk(count: int = 50_000, shards: int = 4) -> None:
+    """
+    Times put_many() and get_many() of the same pairs on a single separate chaining map
+    and on a ShardedHashMap, whose shards load and look up their parts in parallel.
+    """
+    pairs = [('key' + str(i), i) for i in range(count)]
+    keys = [key for key, value in pairs]
+
+    m = hash_map_sc.HashMap(11, hash_function_2)
+    start = perf_counter()
+    m.put_many(pairs)
+    m.get_many(keys)
+    elapsed = perf_counter() - start
+    print('single', m.get_size(), f"{elapsed:.2f}s")
+
+    with hash_map_sharded.ShardedHashMap(shards, 'sc', 11, hash_function_2) as m:
+        start = perf_counter()
+        m.put_many(pairs)
+        m.get_many(keys)
+        elapsed = perf_counter() - start
+        print(f"{shards} shards", m.get_size(), f"{elapsed:.2f}s")
+
+
+def bench_dump_load(count: int = 100_000) -> None:
+    """
+    Compares restoring both maps with put() for every pair of get_keys_and_values() against
+    load() of a dump, which puts the buckets back with their cached hashes without rehashing.
+    """
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(11, hash_function_2)
+        m.put_many(('key' + str(i), i) for i in range(count))
+
+        start = perf_counter()
+        keys_vals = m.get_keys_and_values()
+        restored = module.HashMap(11, hash_function_2)
+        for index in range(keys_vals.length()):
+            restored.put(*keys_vals[index])
+        rebuild = perf_counter() - start
+
+        for compress in (False, True):
+            file = io.BytesIO()
+            m.dump(file, compress)
+            file.seek(0)
+            start = perf_counter()
+            restored = module.HashMap.load(file)
+            load = perf_counter() - start
+            print(module.__name__, restored.get_size(), f"{len(file.getvalue()) >> 10} KB",
+                  f"put: {rebuild:.2f}s load: {load:.2f}s" + (" (gzip)" if compress else ""))
+
+
+def bench_durable_put(count: int = 5_000) -> None:
+    """
+    Times put() on a DurableHashMap under each sync policy: an fsync per record, one fsync
+    per interval shared by every record written in it (group commit), and no fsync.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for sync in hash_map_durable.SYNC_POLICIES:
+            path = os.path.join(directory, sync + '.log')
+            with hash_map_durable.DurableHashMap(path, hash_function_2, sync=sync) as m:
+                start = perf_counter()
+                for i in range(count):
+                    m.put('key' + str(i % 1000), i)
+                elapsed = perf_counter() - start
+            print(sync, m.get_size(), f"{count / elapsed:,.0f} puts/s")
+
+
+def bench_server_loopback(count: int = 20_000, clients: int = 64, batch: int = 100) -> None:
+    """
+    Load generator for hash_map_server.py over loopback TCP: clients concurrent tasks share
+    one pooled client and send pipelined put() and get() requests, then the same keys are
+    read back with get_many() batches, one MGET request per batch.
+    """
+    async def run() -> None:
+        server = await hash_map_server.HashMapServer(hash_map_sc.HashMap(11, hash_function_2)).start()
+        port = server.sockets[0].getsockname()[1]
+        keys = ['key' + str(i) for i in range(count)]
+
+        async with await hash_map_server.HashMapClient.connect(port=port) as client:
+            async def worker(first: int) -> None:
+                for index in range(first, count, clients):
+                    await client.put(keys[index], keys[index])
+                    await client.get(keys[index])
+
+            start = perf_counter()
+            await asyncio.gather(*(worker(first) for first in range(clients)))
+            elapsed = perf_counter() - start
+            print('put/get', f"{2 * count / elapsed:,.0f} requests/s")
+
+            start = perf_counter()
+            await asyncio.gather(*(client.get_many(keys[first:first + batch])
+                                   for first in range(0, count, batch)))
+            elapsed = perf_counter() - start
+            print(f'get_many x{batch}', f"{count / elapsed:,.0f} keys/s")
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+# ------------------- BENCHMARKS ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nSC - remove cost by capacity")
+    print("----------------------------")
+    bench_sc_remove()
+
+    print("\nBulk load - put() vs put_many()")
+    print("-------------------------------")
+    bench_bulk_put()
+
+    print("\nOpen addressing - quadratic probing vs Robin Hood after churn")
+    print("-------------------------------------------------------------")
+    bench_open_addressing_lookup()
+
+    print("\nSC - lookups with every key in one bucket")
+    print("-----------------------------------------")
+    bench_sc_colliding_keys()
+
+    print("\nSharded - put_many() and get_many() across worker processes")
+    print("------------------------------------------------------------")
+    bench_sharded_bulk()
+
+    print("\nDump / load - restoring a map without rehashing")
+    print("-----------------------------------------------")
+    bench_dump_load()
+
+    print("\nDurable - put() throughput by sync policy")
+    print("-----------------------------------------")
+    bench_durable_put()
+
+    print("\nServer - loopback load generator")
+    print("--------------------------------")
+    bench_server_loopback()
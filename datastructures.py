@@ -2,6 +2,18 @@
 # Description: Provided data structures necessary that are imported intomain programs. 
 
 
+import gzip
+import pickle
+import struct
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import numpy as np
+except ImportError:  # batch hashing falls back to the scalar hash functions
+    np = None
+
+
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
 class DynamicArrayException(Exception):
@@ -74,6 +86,45 @@ class DynamicArray:
         return len(self._data)
 
 
+# Precomputed table capacities: the distinct values of the first prime at or above 2 ** (k / 4)
+# for k = 0 to 128. For small k several k share a prime, so the ladder starts with the small
+# primes 2, 3, 5, 7, 11, 13, 17, 23; from 29 on there is one entry per k, each about 2 ** (1 / 4)
+# times the one before, so the primes double every four entries and any growth factor lands
+# close to its target without primality testing
+PRIME_CAPACITIES = (
+    2, 3, 5, 7, 11, 13, 17, 23, 29, 37, 41, 47, 59, 67, 79, 97, 109, 131, 157, 191, 223, 257, 307,
+    367, 431, 521, 613, 727, 863, 1031, 1223, 1451, 1723, 2053, 2437, 2897, 3449, 4099, 4871, 5801,
+    6899, 8209, 9743, 11587, 13781, 16411, 19489, 23173, 27581, 32771, 38971, 46349, 55109, 65537,
+    77951, 92683, 110221, 131101, 155887, 185369, 220447, 262147, 311747, 370759, 440893, 524309,
+    623521, 741457, 881779, 1048583, 1246997, 1482919, 1763491, 2097169, 2493949, 2965847, 3526987,
+    4194319, 4987901, 5931649, 7053971, 8388617, 9975803, 11863289, 14107921, 16777259, 19951597,
+    23726569, 28215809, 33554467, 39903197, 47453149, 56431657, 67108879, 79806341, 94906297,
+    112863217, 134217757, 159612679, 189812533, 225726419, 268435459, 319225391, 379625083,
+    451452839, 536870923, 638450719, 759250133, 902905657, 1073741827, 1276901429, 1518500279,
+    1805811341, 2147483659, 2553802871, 3037000507, 3611622607, 4294967311,
+)
+
+
+def next_prime_capacity(capacity: int) -> int:
+    """
+    Return the smallest prime table capacity at or above the given capacity,
+    looked up in PRIME_CAPACITIES.
+    """
+    index = bisect_left(PRIME_CAPACITIES, capacity)
+    if index < len(PRIME_CAPACITIES):
+        return PRIME_CAPACITIES[index]
+
+    # past the end of the table, search odd numbers by trial division
+    capacity |= 1
+    factor = 3
+    while factor ** 2 <= capacity:
+        if capacity % factor == 0:
+            capacity += 2
+            factor = 1
+        factor += 2
+    return capacity
+
+
 def hash_function_1(key: str) -> int:
     """Sample Hash function #1 to be used with HashMap implementation"""
     hash = 0
@@ -92,6 +143,232 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+_MASK_64 = (1 << 64) - 1
+
+
+def mix_hash(key_hash: int) -> int:
+    """
+    Scramble a hash so that every bit of it affects the low bits, using the 64-bit
+    finalizer of MurmurHash3. Used by power-of-two tables, which index with a bit mask.
+    """
+    key_hash &= _MASK_64
+    key_hash ^= key_hash >> 33
+    key_hash = (key_hash * 0xFF51AFD7ED558CCD) & _MASK_64
+    key_hash ^= key_hash >> 33
+    key_hash = (key_hash * 0xC4CEB9FE1A85EC53) & _MASK_64
+    key_hash ^= key_hash >> 33
+    return key_hash
+
+
+# Cells (keys times the longest of them) of the code point matrix built per NumPy call
+# by the batch hash functions, bounds its size whatever the mix of key lengths
+_BATCH_CELLS = 1 << 20
+
+
+def _code_points(keys: list) -> "np.ndarray":
+    """
+    Return the keys as a (number of keys, longest key) matrix of unicode code points,
+    padded with zeros. Zero padding adds nothing to either sample hash function.
+    """
+    text = np.asarray(keys, dtype=str)
+    return text.view(np.uint32).reshape(len(keys), text.itemsize // 4)
+
+
+def _batch_hash(keys, scalar_function, reduce) -> list:
+    """
+    Hash a sequence of keys with reduce(), which maps a code point matrix to the hash of
+    each of its rows. The keys are sorted by length and cut into chunks of at most
+    _BATCH_CELLS cells, so a long key only widens the matrix of keys about as long.
+    Falls back to calling scalar_function once per key without NumPy or if any key is
+    not a string, so the result (or the TypeError) is that of the scalar function.
+    """
+    keys = list(keys)
+    if np is None or not keys or not all(isinstance(key, str) for key in keys):
+        return [scalar_function(key) for key in keys]
+
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    order = np.argsort(lengths, kind='stable')
+    lengths = lengths[order]
+    hashes = np.empty(len(keys), dtype=np.int64)
+    start = 0
+    while start < len(keys):
+        # widest key of a chunk is its last one, binary search the longest chunk that fits
+        low = start + 1
+        high = min(len(keys), start + max(1, _BATCH_CELLS // max(1, int(lengths[start]))))
+        while low < high:
+            middle = (low + high + 1) // 2
+            if (middle - start) * int(lengths[middle - 1]) <= _BATCH_CELLS:
+                low = middle
+            else:
+                high = middle - 1
+        end = low
+        rows = order[start:end]
+        hashes[rows] = reduce(_code_points([keys[index] for index in rows.tolist()]))
+        start = end
+    return hashes.tolist()
+
+
+def _sum_codes(codes: "np.ndarray") -> "np.ndarray":
+    """
+    Return hash_function_1 of each row of a code point matrix.
+    """
+    return codes.sum(axis=1, dtype=np.int64)
+
+
+def _sum_weighted_codes(codes: "np.ndarray") -> "np.ndarray":
+    """
+    Return hash_function_2 of each row of a code point matrix, without an int64 copy of it.
+    """
+    # weight of each character is its 1-based position in the key
+    weights = np.arange(1, codes.shape[1] + 1, dtype=np.int64)
+    return np.einsum('ij,j->i', codes, weights, dtype=np.int64, casting='safe')
+
+
+def hash_function_1_batch(keys) -> list:
+    """
+    Hash a sequence of string keys at once with hash_function_1.
+    Returns a list of hashes identical to calling hash_function_1 on each key,
+    computed with NumPy when it is installed.
+    """
+    return _batch_hash(keys, hash_function_1, _sum_codes)
+
+
+def hash_function_2_batch(keys) -> list:
+    """
+    Hash a sequence of string keys at once with hash_function_2.
+    Returns a list of hashes identical to calling hash_function_2 on each key,
+    computed with NumPy when it is installed.
+    """
+    return _batch_hash(keys, hash_function_2, _sum_weighted_codes)
+
+
+_BATCH_HASH_FUNCTIONS = {
+    hash_function_1: hash_function_1_batch,
+    hash_function_2: hash_function_2_batch,
+}
+
+
+def hash_keys(function, keys) -> list:
+    """
+    Hash a sequence of keys with the hash function passed in, using its batch variant
+    when there is one, else calling the function once per key.
+    """
+    batch_function = _BATCH_HASH_FUNCTIONS.get(function)
+    if batch_function is not None:
+        return batch_function(keys)
+    return [function(key) for key in keys]
+
+
+# Ids that files holding a table record for the hash function its hashes were made with.
+# 0 stands for any other function, which has to be passed in again to read the file.
+HASH_FUNCTIONS = {
+    1: hash_function_1,
+    2: hash_function_2,
+}
+
+
+def hash_function_id(function) -> int:
+    """
+    Return the id of a hash function in HASH_FUNCTIONS, or 0 if it is not one of them.
+    """
+    for function_id, known_function in HASH_FUNCTIONS.items():
+        if known_function is function:
+            return function_id
+    return 0
+
+
+def resolve_hash_function(function_id: int, function=None):
+    """
+    Return the hash function a file recorded with function_id was written with.
+    A function passed in must be that one; for id 0 it is required.
+    Raises ValueError otherwise.
+    """
+    if function_id not in HASH_FUNCTIONS and function_id != 0:
+        raise ValueError(f"unknown hash function id {function_id}")
+    if function is None:
+        if function_id == 0:
+            raise ValueError("written with a custom hash function, which must be passed in")
+        return HASH_FUNCTIONS[function_id]
+    if hash_function_id(function) != function_id:
+        raise ValueError("hash function differs from the one the file was written with")
+    return function
+
+
+# Types of a value stored as bytes by the shared memory and file backed tables
+VALUE_BYTES = 0
+VALUE_STR = 1
+VALUE_PICKLED = 2
+
+
+def encode_value(value: object) -> tuple:
+    """
+    Return the (type, bytes) a value is stored as: bytes as they are, a string as UTF-8,
+    any other object pickled.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return VALUE_BYTES, bytes(value)
+    if isinstance(value, str):
+        return VALUE_STR, value.encode()
+    return VALUE_PICKLED, pickle.dumps(value)
+
+
+def decode_value(value_type: int, raw) -> object:
+    """
+    Return the value stored as the bytes (or buffer) raw by encode_value().
+    Raises ValueError for an unknown type.
+    """
+    if value_type == VALUE_BYTES:
+        return bytes(raw)
+    if value_type == VALUE_STR:
+        return str(raw, 'utf-8')
+    if value_type == VALUE_PICKLED:
+        return pickle.loads(raw)
+    raise ValueError(f"unknown value type {value_type}")
+
+
+# Buckets written per pickled chunk of a dump, bounds the memory a dump or load holds at once
+DUMP_CHUNK = 65536
+
+_DUMP_MAGIC = b'HMDUMP01'
+# dump header: magic, kind of table ('oa' or 'sc'), 1 if the rest of the dump is gzip compressed
+_DUMP_HEADER = struct.Struct('<8s2sB')
+
+
+@contextmanager
+def dump_stream(file, kind: str, compress: bool = False):
+    """
+    Write the header of a dump of a table of the kind passed in to a binary file object,
+    then yield the stream the rest of the dump is written to, which is the file itself
+    or, if compress, a gzip stream over it that is finished when the block ends.
+    """
+    file.write(_DUMP_HEADER.pack(_DUMP_MAGIC, kind.encode(), compress))
+    if not compress:
+        yield file
+        return
+    with gzip.GzipFile(fileobj=file, mode='wb', compresslevel=6) as stream:
+        yield stream
+
+
+@contextmanager
+def load_stream(file, kind: str):
+    """
+    Read the header of a dump from a binary file object and yield the stream the rest of
+    the dump is read from, decompressing it if it was written compressed.
+    Raises ValueError if the file does not hold a dump of a table of the kind passed in.
+    """
+    header = file.read(_DUMP_HEADER.size)
+    if len(header) != _DUMP_HEADER.size or header[:len(_DUMP_MAGIC)] != _DUMP_MAGIC:
+        raise ValueError("not a HashMap dump")
+    magic, dump_kind, compressed = _DUMP_HEADER.unpack(header)
+    if dump_kind != kind.encode():
+        raise ValueError(f"dump of table kind {dump_kind.decode()!r}, not {kind!r}")
+    if not compressed:
+        yield file
+        return
+    with gzip.GzipFile(fileobj=file, mode='rb') as stream:
+        yield stream
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -99,11 +376,15 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    def __init__(self, key: str, value: object, next: "SLNode" = None, key_hash: int = None) -> None:
+        """
+        Initialize node given a key and value.
+        The full hash of the key is cached so the map never recomputes it.
+        """
         self.key = key
         self.value = value
         self.next = next
+        self.hash = key_hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -137,7 +418,7 @@ class LinkedListIterator:
 class LinkedList:
     """
     Class implementing a Singly Linked List
-    Supported methods are: insert, remove, contains, length, iterator
+    Supported methods are: insert, remove, pop, contains, length, iterator
     """
 
     def __init__(self) -> None:
@@ -164,9 +445,9 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
+    def insert(self, key: str, value: object, key_hash: int = None) -> None:
         """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+        self._head = SLNode(key, value, self._head, key_hash)
         self._size += 1
 
     def remove(self, key: str) -> bool:
@@ -188,9 +469,38 @@ class LinkedList:
             previous, node = node, node.next
         return False
 
-    def contains(self, key: str) -> SLNode:
-        """Return node with matching key, or None if no match"""
+    def pop(self, key: str, key_hash: int = None) -> SLNode:
+        """
+        Remove first node with matching key in a single pass.
+        Return the removed node, or None if no match.
+        """
+        previous, node = None, self._head
+        while node:
+
+            if (key_hash is None or node.hash == key_hash) and node.key == key:
+                if previous:
+                    previous.next = node.next
+                else:
+                    self._head = node.next
+                self._size -= 1
+                return node
+
+            previous, node = node, node.next
+        return None
+
+    def contains(self, key: str, key_hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        When key_hash is given, cached hashes are compared before the keys.
+        """
         node = self._head
+        if key_hash is not None:
+            while node:
+                if node.hash == key_hash and node.key == key:
+                    return node
+                node = node.next
+            return node
+
         while node:
             if node.key == key:
                 return node
@@ -202,14 +512,121 @@ class LinkedList:
         return self._size
 
 
+class ArrayBucket:
+    """
+    Small flat array of SLNodes for a separate chaining bucket holding a few entries
+    Supported methods are: insert, pop, contains, length, iterator
+    """
+
+    def __init__(self, *nodes: SLNode) -> None:
+        """Initialize the bucket with the given nodes."""
+        self._nodes = list(nodes)
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'ARR [' + ', '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes of the bucket."""
+        return iter(self._nodes)
+
+    def insert(self, node: SLNode) -> None:
+        """Add a node whose key is not in the bucket."""
+        self._nodes.append(node)
+
+    def pop(self, key: str, key_hash: int) -> SLNode:
+        """Remove and return the node with matching key, or None if no match."""
+        nodes = self._nodes
+        for index in range(len(nodes)):
+            if nodes[index].hash == key_hash and nodes[index].key == key:
+                # order does not matter, move the last node into the gap
+                node = nodes[index]
+                nodes[index] = nodes[-1]
+                nodes.pop()
+                return node
+        return None
+
+    def contains(self, key: str, key_hash: int) -> SLNode:
+        """Return node with matching key, or None if no match."""
+        for node in self._nodes:
+            if node.hash == key_hash and node.key == key:
+                return node
+        return None
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+
+class SortedBucket:
+    """
+    SLNodes of a separate chaining bucket kept sorted by (hash, key), so a bucket that
+    many keys collide into is searched with binary search in O(log n).
+    Keys sharing a hash must be comparable with each other, as strings are.
+    Supported methods are: insert, pop, contains, length, iterator
+    """
+
+    def __init__(self, nodes) -> None:
+        """Initialize the bucket with the given nodes."""
+        self._order = []
+        self._nodes = []
+        for node in sorted(nodes, key=lambda node: (node.hash, node.key)):
+            self._order.append((node.hash, node.key))
+            self._nodes.append(node)
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'SORTED [' + ', '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes of the bucket."""
+        return iter(self._nodes)
+
+    def _search(self, key: str, key_hash: int) -> int:
+        """Return the position of the matching key, or -1 if no match."""
+        position = bisect_left(self._order, (key_hash, key))
+        if position < len(self._order) and self._order[position] == (key_hash, key):
+            return position
+        return -1
+
+    def insert(self, node: SLNode) -> None:
+        """Add a node whose key is not in the bucket."""
+        position = bisect_left(self._order, (node.hash, node.key))
+        self._order.insert(position, (node.hash, node.key))
+        self._nodes.insert(position, node)
+
+    def pop(self, key: str, key_hash: int) -> SLNode:
+        """Remove and return the node with matching key, or None if no match."""
+        position = self._search(key, key_hash)
+        if position == -1:
+            return None
+        del self._order[position]
+        return self._nodes.pop(position)
+
+    def contains(self, key: str, key_hash: int) -> SLNode:
+        """Return node with matching key, or None if no match."""
+        position = self._search(key, key_hash)
+        if position == -1:
+            return None
+        return self._nodes[position]
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+
 # ---------- For use in Open Addressing (OA) HashMap  ---------- #
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
-        """Initialize an entry for use in a hash map."""
+    def __init__(self, key: str, value: object, key_hash: int = None) -> None:
+        """
+        Initialize an entry for use in a hash map.
+        The full hash of the key is cached so the map never recomputes it.
+        """
         self.key = key
         self.value = value
+        self.hash = key_hash
 
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
@@ -0,0 +1,477 @@
+# Description: Implementation of a Hash Map with the compact, insertion-ordered layout used by CPython's dict.
+# The key/value pairs live in dense entry arrays (hashes, keys and values) in the order they were inserted, and the
+# hash table itself is a small index array of integers pointing into them. The integer width of the index array
+# (8, 16, 32 or 64 bits) is chosen from the capacity, so at a 2/3 load the table costs a few bytes per bucket.
+# Collisions are resolved in the index array with triangular probing on a power-of-two capacity, using hashes passed
+# through mix_hash(). Removed elements leave a DUMMY index behind (the equivalent of a Tombstone) and a hole in the
+# entry arrays, both of which are dropped the next time the index array is rebuilt.
+# Iteration and get_keys_and_values() scan only the dense entries, in insertion order, and return (key, value) pairs.
+# Has the same methods as the hash map in hash_map_oa.py: put() (insert key/value), resize_table(), table_load(),
+# empty_buckets(), get(), contains_key(), remove(), pop(), setdefault(), update_with(), put_many(), get_many(),
+# remove_many(), reserve(), get_keys_and_values(), clear(), __iter__() and __next__().
+
+
+from array import array
+
+from datastructures import (DynamicArray, hash_function_1, hash_function_2, hash_keys,
+                            mix_hash)
+
+# values of the index array other than an entry index
+EMPTY = -1
+DUMMY = -2
+
+# marks the key of a removed entry in the dense entry arrays
+_DELETED = object()
+
+
+def _index_typecode(capacity: int) -> str:
+    """
+    Returns the smallest array typecode that holds every entry index of a table
+    with the given capacity, as well as EMPTY and DUMMY.
+    """
+    if capacity <= 1 << 7:
+        return 'b'
+    if capacity <= 1 << 15:
+        return 'h'
+    if capacity <= 1 << 31:
+        return 'i'
+    return 'q'
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses a compact index array
+        with triangular probing for collision resolution
+        """
+        # capacity must be a power of two
+        self._capacity = self._next_power_of_two(capacity)
+        self._indices = array(_index_typecode(self._capacity), [EMPTY]) * self._capacity
+
+        # dense entry arrays, in insertion order
+        self._hashes = []
+        self._keys = []
+        self._values = []
+
+        self._hash_function = function
+        self._size = 0
+
+    @classmethod
+    def with_expected_size(cls, count: int, function=hash_function_1) -> "HashMap":
+        """
+        Returns a new HashMap with capacity for count elements within the 2/3 load factor.
+        """
+        return cls((3 * count + 1) // 2 + 1, function)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            index = self._indices[i]
+            if index == EMPTY:
+                out += str(i) + ': None\n'
+            elif index == DUMMY:
+                out += str(i) + ': DUMMY\n'
+            else:
+                out += str(i) + ': ' + str(index) + ' (' + str(self._keys[index]) + ': ' + \
+                       str(self._values[index]) + ')\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _next_power_of_two(capacity: int) -> int:
+        """
+        Rounds the capacity up to a power of two
+        """
+        return 1 << max(capacity - 1, 1).bit_length()
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the hash of the key passed through mix_hash(), since buckets are chosen
+        from its low bits.
+        """
+        return mix_hash(self._hash_function(key))
+
+    def _hash_many(self, keys: list) -> list:
+        """
+        Returns the mixed hashes of a list of keys, hashing them together with hash_keys().
+        """
+        return [mix_hash(key_hash) for key_hash in hash_keys(self._hash_function, keys)]
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the triangular probe sequence for the key once over the index array.
+        Returns (bucket, True) for the bucket pointing at the key's entry, otherwise
+        (bucket, False) for the bucket the key should be inserted at: the first DUMMY
+        passed on the way, or the EMPTY bucket that ended the probe.
+        """
+        indices, hashes, keys = self._indices, self._hashes, self._keys
+        mask = self._capacity - 1
+        bucket = key_hash & mask
+        step = 1
+        dummy_bucket = None
+
+        while True:
+            index = indices[bucket]
+            if index == EMPTY:
+                break
+            if index == DUMMY:
+                if dummy_bucket is None:
+                    dummy_bucket = bucket
+            elif hashes[index] == key_hash and keys[index] == key:
+                return bucket, True
+
+            # triangular probing for next bucket
+            bucket = (bucket + step) & mask
+            step += 1
+
+        if dummy_bucket is not None:
+            return dummy_bucket, False
+        return bucket, False
+
+    def _insert_at(self, bucket: int, key: str, key_hash: int, value: object) -> None:
+        """
+        Appends a new entry and points the bucket returned by _find_slot() at it.
+        """
+        self._indices[bucket] = len(self._keys)
+        self._hashes.append(key_hash)
+        self._keys.append(key)
+        self._values.append(value)
+        self._size += 1
+
+    def _remove_at(self, bucket: int) -> object:
+        """
+        Removes the entry the bucket points at, leaving a DUMMY bucket and a hole in the
+        entry arrays. Returns the removed value.
+        """
+        index = self._indices[bucket]
+        value = self._values[index]
+        self._indices[bucket] = DUMMY
+        self._keys[index] = _DELETED
+        self._values[index] = None
+        self._size -= 1
+        return value
+
+    def _make_room(self) -> None:
+        """
+        Rebuilds the index array if one more entry would pass the 2/3 load factor.
+        Entries include the holes left by removals, which also bounds the DUMMY buckets.
+        The new capacity is sized from the active elements only, so a table full of holes
+        is rebuilt at the same size or smaller.
+        """
+        if 3 * (len(self._keys) + 1) > 2 * self._capacity:
+            self.resize_table(3 * (self._size + 1))
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts a new element into the hash map if the key is not in the hash map.
+        If the key is in the hash map, updates the key with new value in place, keeping
+        its position in the insertion order.
+        Maintains table load factor of at most 2/3 by rebuilding the index array with resize_table().
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        bucket, found = self._find_slot(key, key_hash)
+
+        if found:
+            self._values[self._indices[bucket]] = value
+        else:
+            self._insert_at(bucket, key, key_hash, value)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the index array to the power of two at or above the new capacity, growing it
+        further if needed to stay within the 2/3 load factor.
+        Holes left by removed entries are closed first, then only the index array is rebuilt
+        from the cached hashes; the entries themselves are not copied or rehashed.
+        """
+        if new_capacity < self._size:
+            return
+
+        new_capacity = self._next_power_of_two(new_capacity)
+        while 3 * (self._size + 1) > 2 * new_capacity:
+            new_capacity *= 2
+
+        if len(self._keys) != self._size:
+            self._close_holes()
+
+        indices = array(_index_typecode(new_capacity), [EMPTY]) * new_capacity
+        mask = new_capacity - 1
+        for index, key_hash in enumerate(self._hashes):
+            bucket = key_hash & mask
+            step = 1
+            while indices[bucket] != EMPTY:
+                bucket = (bucket + step) & mask
+                step += 1
+            indices[bucket] = index
+
+        self._indices = indices
+        self._capacity = new_capacity
+
+    def _close_holes(self) -> None:
+        """
+        Drops removed entries from the entry arrays, keeping the insertion order.
+        """
+        live = [index for index, key in enumerate(self._keys) if key is not _DELETED]
+        self._hashes = [self._hashes[index] for index in live]
+        self._keys = [self._keys[index] for index in live]
+        self._values = [self._values[index] for index in live]
+
+    def table_load(self) -> float:
+        """
+        Calculates the table load factor, the average number of elements per bucket.
+        Returns a float value containing the table load factor.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that do not point at an active element.
+        """
+        return self._capacity - self._size
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        bucket, found = self._find_slot(key, self._hash(key))
+        if found:
+            return self._values[self._indices[bucket]]
+        return default
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Probes for the key (string) passed in once to determine if it is in the hash map.
+        Returns True if key is in the map, False otherwise.
+        """
+        if self._size == 0:
+            return False
+
+        return self._find_slot(key, self._hash(key))[1]
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key passed in (string) from the hash map, decreases the map's size by 1.
+        """
+        self.pop(key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map with a single probe and returns
+        its value, or default (None unless given) if key is not in the hash map.
+        """
+        bucket, found = self._find_slot(key, self._hash(key))
+        if not found:
+            return default
+        return self._remove_at(bucket)
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        Hashes and probes for the key once.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        bucket, found = self._find_slot(key, key_hash)
+        if found:
+            return self._values[self._indices[bucket]]
+
+        self._insert_at(bucket, key, key_hash, value)
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map.
+        Hashes and probes for the key once, and returns the new value.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        bucket, found = self._find_slot(key, key_hash)
+        if found:
+            index = self._indices[bucket]
+            self._values[index] = function(self._values[index])
+            return self._values[index]
+
+        value = function(default)
+        self._insert_at(bucket, key, key_hash, value)
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in.
+        The keys are hashed together and the index array is sized once for the keys that are new.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        key_hashes = self._hash_many(keys)
+        if self._size:
+            # the keys already in the map are updated in place first, so the index array is sized
+            # for the new keys only; every pair of a new key is kept, in order, for below
+            new_pairs = []
+            for (key, value), key_hash in zip(pairs, key_hashes):
+                bucket, found = self._find_slot(key, key_hash)
+                if found:
+                    self._values[self._indices[bucket]] = value
+                else:
+                    new_pairs.append(((key, value), key_hash))
+            new_keys = {key for (key, value), key_hash in new_pairs}
+        else:
+            # in an empty map every key is new
+            new_pairs = zip(pairs, key_hashes)
+            new_keys = set(keys)
+
+        self.reserve(self._size + len(new_keys))
+        for (key, value), key_hash in new_pairs:
+            bucket, found = self._find_slot(key, key_hash)
+            if found:
+                self._values[self._indices[bucket]] = value
+            else:
+                self._insert_at(bucket, key, key_hash, value)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            bucket, found = self._find_slot(key, key_hash)
+            values.append(self._values[self._indices[bucket]] if found else default)
+        return values
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            bucket, found = self._find_slot(key, key_hash)
+            values.append(self._remove_at(bucket) if found else default)
+        return values
+
+    def reserve(self, count: int) -> None:
+        """
+        Rebuilds the index array once so that count elements fit within the 2/3 load factor,
+        counting the holes currently in the entry arrays (the rebuild drops them).
+        """
+        if 3 * (len(self._keys) - self._size + count + 1) > 2 * self._capacity:
+            self.resize_table((3 * count + 1) // 2 + 1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Retrieves the keys and values of each element in the hash map and
+        returns a dynamic array with a tuple at each index (key, value), in insertion order.
+        Only the dense entry arrays are scanned.
+        """
+        keys_vals = DynamicArray()
+        for key, value in zip(self._keys, self._values):
+            if key is not _DELETED:
+                keys_vals.append((key, value))
+        return keys_vals
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, emptying the index and entry arrays.
+        Size becomes 0, but underlying capacity remains the same.
+        """
+        self._indices = array(_index_typecode(self._capacity), [EMPTY]) * self._capacity
+        self._hashes = []
+        self._keys = []
+        self._values = []
+        self._size = 0
+
+    def __iter__(self):
+        """
+        Enables iteration (for i in map) and initializes an index variable to track
+        each entry in the map.
+        """
+        self._index = 0
+        return self
+
+    def __next__(self) -> tuple:
+        """
+        Returns the next active element as a (key, value) tuple, in insertion order.
+        Stops iteration once every entry has been visited.
+        """
+        keys = self._keys
+        while self._index < len(keys) and keys[self._index] is _DELETED:
+            self._index += 1
+
+        if self._index >= len(keys):
+            raise StopIteration
+
+        index = self._index
+        self._index += 1
+        return keys[index], self._values[index]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nresize example")
+    print("--------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\ninsertion order example")
+    print("-----------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    m.put('2', 'updated')
+    print(m)
+    print(m.get_keys_and_values())
+    for key, value in m:
+        print('K:', key, 'V:', value)
@@ -0,0 +1,444 @@
+# Description: Thread-safe Hash Map with Separate Chaining, built on the hash map in hash_map_sc.py.
+# The buckets are split into contiguous ranges (stripes), each guarded by its own lock, so operations on keys in
+# different stripes run in parallel: on free-threaded CPython builds they can use several cores, and with the GIL
+# they at least no longer queue behind a single map-wide lock. Resizing, batch operations and other whole-map
+# operations take every lock, in stripe order, so they never deadlock with each other.
+# The size is kept as one counter per stripe, each changed only under its lock, so no shared counter is contended.
+# Adds the atomic compound operations put_if_absent() and compute() to the methods of hash_map_sc.py (setdefault()
+# and update_with() are atomic as well), and __iter__(), which is weakly consistent: it locks one stripe at a time,
+# never fails during concurrent mutation, yields each key at most once and yields every key present for the whole
+# iteration.
+
+
+import threading
+from contextlib import contextmanager
+
+from datastructures import DynamicArray, SLNode, hash_function_1, hash_function_2
+from hash_map_sc import GROWTH_FACTOR, MAX_LOAD_FACTOR, MIN_LOAD_FACTOR, HashMap
+
+# number of locks the buckets are split across by default
+STRIPES = 16
+
+
+class ConcurrentHashMap(HashMap):
+    """
+    Separate chaining HashMap that is safe to share between threads.
+    Single-key operations hold only the lock of the stripe containing the key's bucket, and
+    whole-map operations hold every lock. Functions passed to compute() and update_with()
+    run while the key's stripe is locked, so they must be short and must not use the map.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 stripes: int = STRIPES,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
+        """
+        Initialize new HashMap that uses separate chaining for collision resolution
+        with its buckets split across stripes locks
+        """
+        super().__init__(capacity, function, max_load_factor, min_load_factor, growth_factor)
+        # reentrant, so a whole-map operation can call another one while holding every lock
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        # elements added minus elements removed under each lock, only their sum is meaningful
+        self._counts = [0] * stripes
+        # nesting depth of _all_locked() in the thread holding every lock
+        self._all_depth = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output, holding every lock
+        """
+        with self._all_locked():
+            return super().__str__()
+
+    def get_size(self) -> int:
+        """
+        Return size of map, the sum of the per-stripe counters.
+        Reads the counters without locking, so it may miss operations still in progress.
+        """
+        return sum(self._counts)
+
+    # ------------------------------------------------------------------ #
+
+    @contextmanager
+    def _locked(self, key_hash: int):
+        """
+        Holds the lock of the stripe containing the bucket of the hash and yields
+        (bucket index, stripe). Retries when a resize replaces the table before the
+        lock is acquired, since the bucket then belongs to a different stripe.
+        """
+        while True:
+            capacity = self._capacity
+            index = key_hash % capacity
+            stripe = index * len(self._locks) // capacity
+            with self._locks[stripe]:
+                if capacity == self._capacity:
+                    yield index, stripe
+                    return
+
+    @contextmanager
+    def _all_locked(self):
+        """
+        Holds every lock, acquired in stripe order, with the per-stripe counters summed
+        into _size so the HashMap methods can be used unchanged. The outermost call folds
+        _size back into the counters when it ends.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            # only the thread holding every lock can see a depth above 0
+            if self._all_depth == 0:
+                self._size = sum(self._counts)
+            self._all_depth += 1
+            try:
+                yield
+            finally:
+                self._all_depth -= 1
+                if self._all_depth == 0:
+                    for stripe in range(len(self._counts)):
+                        self._counts[stripe] = 0
+                    self._counts[0] = self._size
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def _grow_if_full(self) -> None:
+        """
+        Grows the table, holding every lock, once the load factor reaches max_load_factor.
+        The first check runs without locks, so concurrent inserts can overshoot the
+        threshold slightly before one of them resizes; the resize checks again.
+        """
+        if self.get_size() >= self._max_load_factor * self._capacity:
+            with self._all_locked():
+                self._make_room()
+
+    def _shrink_if_sparse(self) -> None:
+        """
+        Shrinks the table, holding every lock, once the load factor drops below min_load_factor.
+        """
+        if self._capacity > self._min_capacity and self.get_size() < self._min_load_factor * self._capacity:
+            with self._all_locked():
+                self._release_room()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts a new element (key, value) into the hash map if the key is not in the hash map.
+        If the key is in the hash map, updates the key with new value.
+        """
+        key_hash = self._hash_function(key)
+        self._grow_if_full()
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            if element:
+                element.value = value
+            else:
+                self._add_node(index, SLNode(key, value, None, key_hash))
+                self._counts[stripe] += 1
+
+    def put_if_absent(self, key: str, value: object) -> object:
+        """
+        Inserts the key (string) with the value passed in only if the key is not in the hash map.
+        Returns the value already in the hash map, or None if the key was inserted.
+        """
+        key_hash = self._hash_function(key)
+        self._grow_if_full()
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            if element:
+                return element.value
+
+            self._add_node(index, SLNode(key, value, None, key_hash))
+            self._counts[stripe] += 1
+            return None
+
+    def compute(self, key: str, function) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), or function(None)
+        if the key is not in the hash map, as one atomic step. A result of None removes the key.
+        Returns the new value.
+        """
+        key_hash = self._hash_function(key)
+        self._grow_if_full()
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            value = function(element.value if element else None)
+
+            if value is None:
+                if element:
+                    self._remove_from(self._buckets, index, key, key_hash)
+                    self._counts[stripe] -= 1
+            elif element:
+                element.value = value
+            else:
+                self._add_node(index, SLNode(key, value, None, key_hash))
+                self._counts[stripe] += 1
+
+        if value is None:
+            self._shrink_if_sparse()
+        return value
+
+    def get(self, key: str, default: object = None):
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        key_hash = self._hash_function(key)
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            return element.value if element else default
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the map, False otherwise.
+        """
+        key_hash = self._hash_function(key)
+        with self._locked(key_hash) as (index, stripe):
+            return self._search_bucket(self._buckets[index], key, key_hash) is not None
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map and returns its value,
+        or default (None unless given) if key is not in the hash map.
+        Shrinks the table once the load factor drops below min_load_factor.
+        """
+        key_hash = self._hash_function(key)
+        with self._locked(key_hash) as (index, stripe):
+            element = self._remove_from(self._buckets, index, key, key_hash)
+            if element:
+                self._counts[stripe] -= 1
+
+        if not element:
+            return default
+
+        self._shrink_if_sparse()
+        return element.value
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        """
+        key_hash = self._hash_function(key)
+        self._grow_if_full()
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            if element:
+                return element.value
+
+            self._add_node(index, SLNode(key, value, None, key_hash))
+            self._counts[stripe] += 1
+            return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map, as one atomic step.
+        Returns the new value.
+        """
+        key_hash = self._hash_function(key)
+        self._grow_if_full()
+        with self._locked(key_hash) as (index, stripe):
+            element = self._search_bucket(self._buckets[index], key, key_hash)
+            if element:
+                element.value = function(element.value)
+                return element.value
+
+            value = function(default)
+            self._add_node(index, SLNode(key, value, None, key_hash))
+            self._counts[stripe] += 1
+            return value
+
+    # ------------------------------------------------------------------ #
+
+    def set_load_factors(self, max_load_factor: float = None, min_load_factor: float = None,
+                         growth_factor: float = None) -> None:
+        """
+        Changes the load factor thresholds and growth factor, holding every lock.
+        """
+        with self._all_locked():
+            super().set_load_factors(max_load_factor, min_load_factor, growth_factor)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash map to the new capacity (integer) passed in, holding every lock.
+        """
+        with self._all_locked():
+            super().resize_table(new_capacity)
+
+    def table_load(self) -> float:
+        """
+        Returns the table load factor, the average number of elements per bucket.
+        """
+        return self.get_size() / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that have no nodes/elements, holding every lock.
+        """
+        with self._all_locked():
+            return super().empty_buckets()
+
+    def shrink_to_fit(self) -> None:
+        """
+        Rebuilds the hash map at the smallest capacity that holds its elements, holding every lock.
+        """
+        with self._all_locked():
+            super().shrink_to_fit()
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in, holding every
+        lock, so other threads see either none or all of the batch.
+        """
+        pairs = list(pairs)
+        with self._all_locked():
+            super().put_many(pairs)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        read together while holding every lock.
+        """
+        keys = list(keys)
+        with self._all_locked():
+            return super().get_many(keys, default)
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in, holding every lock, and returns a dynamic
+        array with the removed values.
+        """
+        keys = list(keys)
+        with self._all_locked():
+            return super().remove_many(keys, default)
+
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count elements fit within max_load_factor, holding every lock.
+        """
+        with self._all_locked():
+            super().reserve(count)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element, taken as one
+        consistent snapshot while holding every lock.
+        """
+        with self._all_locked():
+            return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, holding every lock.
+        """
+        with self._all_locked():
+            super().clear()
+
+    def _dump_settings(self) -> dict:
+        """
+        Records the number of stripes in a dump.
+        """
+        return {**super()._dump_settings(), 'stripes': len(self._locks)}
+
+    @classmethod
+    def _load_settings(cls, settings: dict) -> dict:
+        """
+        Passes the number of stripes recorded in a dump to the constructor.
+        """
+        arguments = super()._load_settings(settings)
+        if 'stripes' in settings:
+            arguments['stripes'] = settings['stripes']
+        return arguments
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object, holding every lock.
+        """
+        with self._all_locked():
+            super().dump(file, compress)
+
+    @classmethod
+    def load(cls, file, function=None) -> "ConcurrentHashMap":
+        """
+        Returns a new map with the table written by dump(), its size held in the first
+        per-stripe counter.
+        """
+        map = super().load(file, function)
+        map._counts[0] = map._size
+        return map
+
+    def __iter__(self):
+        """
+        Returns a weakly consistent iterator over (key, value) tuples.
+        Each stripe is copied under its lock and the lock is released before its elements
+        are yielded, so other threads keep working during the iteration. If a resize moves
+        elements between stripes, the scan starts over and skips keys already yielded.
+        """
+        stripes = len(self._locks)
+        # (capacity, buckets scanned) of each scan a resize cut short. A key only changes
+        # stripe when the capacity changes, so the keys such a scan yielded are exactly those
+        # whose bucket at that capacity is below the buckets scanned, and no key has to be
+        # remembered unless a resize happens
+        cut_scans = []
+        while True:
+            capacity = self._capacity
+            scanned = 0
+            for stripe in range(stripes):
+                with self._locks[stripe]:
+                    if capacity != self._capacity:
+                        break
+                    # buckets whose index * stripes // capacity is this stripe
+                    start = -(-stripe * capacity // stripes)
+                    end = -(-(stripe + 1) * capacity // stripes)
+                    items = [(node.key, node.value)
+                             for index in range(start, end)
+                             for node in self._nodes(self._buckets[index])
+                             if not cut_scans or not any(node.hash % old_capacity < old_scanned
+                                                         for old_capacity, old_scanned in cut_scans)]
+
+                yield from items
+                scanned = end
+            else:
+                return
+            cut_scans.append((capacity, scanned))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get example")
+    print("-----------------")
+    m = ConcurrentHashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    print(m.get('str42'), m.contains_key('str42'), m.contains_key('str150'))
+
+    print("\nput_if_absent / compute example")
+    print("-------------------------------")
+    m = ConcurrentHashMap(11, hash_function_2)
+    print(m.put_if_absent('key1', 10), m.put_if_absent('key1', 20), m.get('key1'))
+    print(m.compute('key1', lambda value: value * 3), m.compute('key2', lambda value: 1 if value is None else value))
+    print(m.compute('key1', lambda value: None), m.contains_key('key1'), m.get_size())
+
+    print("\nthreads example")
+    print("---------------")
+    m = ConcurrentHashMap(11, hash_function_2, stripes=8)
+
+    def count_words(offset: int) -> None:
+        for i in range(2000):
+            m.update_with('word' + str((i + offset) % 500), lambda count: count + 1, 0)
+
+    threads = [threading.Thread(target=count_words, args=(n * 7,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(m.get_size(), m.get_capacity(), sum(value for key, value in m))
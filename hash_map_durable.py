@@ -0,0 +1,412 @@
+# Description: Durable Hash Map that survives crashes by logging every change before making it. put(), remove() and
+# pop() append a compact binary record (CRC-32, operation, value type, key and value lengths, then the UTF-8 key and
+# the value as bytes, UTF-8 text or a pickle) to an append-only write-ahead log, then apply the change to an in-memory
+# open addressing (hash_map_oa.py) or separate chaining (hash_map_sc.py) HashMap.
+# The log reaches the disk according to the sync policy: 'always' fsyncs after every record, 'interval' lets a
+# background thread flush and fsync every sync_interval_ms, so all the records written in between share one fsync
+# (group commit), and 'never' leaves it to the operating system.
+# Opening a map replays its log. The log starts with a snapshot of the live elements, written by the last
+# compaction, and the records after it are replayed onto it; a torn or corrupt record, as left by a crash during a
+# write, ends the log and is cut off. Once dead records (replaced values, removed keys and removals of missing keys)
+# pass compact_threshold of the log, a background thread rewrites the log from the live get_keys_and_values() while
+# writes continue, and swaps it in atomically.
+# Includes put(), get(), contains_key(), remove(), pop(), get_size(), get_capacity(), get_keys_and_values(),
+# compact(), sync() and close() (also called when used as a context manager).
+
+
+import os
+import struct
+import threading
+import zlib
+
+import hash_map_oa
+import hash_map_sc
+from datastructures import DynamicArray, decode_value, encode_value, hash_function_1, hash_function_2
+
+# HashMap classes the log is replayed into
+BACKENDS = {'oa': hash_map_oa.HashMap, 'sc': hash_map_sc.HashMap}
+# when the log is forced to disk
+SYNC_ALWAYS = 'always'
+SYNC_INTERVAL = 'interval'
+SYNC_NEVER = 'never'
+SYNC_POLICIES = (SYNC_ALWAYS, SYNC_INTERVAL, SYNC_NEVER)
+# milliseconds between two fsyncs of the 'interval' policy
+SYNC_INTERVAL_MS = 10
+# the log is compacted once dead records are more than this fraction of it
+COMPACT_THRESHOLD = 0.5
+# and hold at least this many records, so small logs are left alone
+COMPACT_MIN_RECORDS = 1024
+
+# operations of a record
+_PUT = 1
+_REMOVE = 2
+# record: CRC-32 of the rest of the record, operation, value type, key length, value length,
+# followed by the key and value bytes
+_CRC = struct.Struct('<I')
+_RECORD = struct.Struct('<BBII')
+
+_MISSING = object()
+
+
+def _record(operation: int, key: str, value: object = None) -> bytes:
+    """
+    Returns the log record of an operation on a key.
+    """
+    key_bytes = key.encode()
+    value_type, value_bytes = encode_value(value) if operation == _PUT else (0, b'')
+    body = _RECORD.pack(operation, value_type, len(key_bytes), len(value_bytes)) + key_bytes + value_bytes
+    return _CRC.pack(zlib.crc32(body)) + body
+
+
+def _sync_directory(path: str) -> None:
+    """
+    Makes a rename in the directory of path durable.
+    """
+    if os.name != 'posix':
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class DurableHashMap:
+    """
+    Hash map kept in memory and made durable by a write-ahead log at path.
+    Safe to use from several threads; every operation holds the map lock.
+    An error raised by a background compaction is raised by the next write or close().
+    """
+
+    def __init__(self,
+                 path: str,
+                 function: callable = hash_function_1,
+                 backend: str = 'sc',
+                 sync: str = SYNC_INTERVAL,
+                 sync_interval_ms: int = SYNC_INTERVAL_MS,
+                 compact_threshold: float = COMPACT_THRESHOLD) -> None:
+        """
+        Initialize a durable HashMap of the backend passed in ('oa' or 'sc'), replaying the
+        log at path if there is one
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {sorted(BACKENDS)}, got {backend!r}")
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f"sync must be one of {SYNC_POLICIES}, got {sync!r}")
+        if sync_interval_ms <= 0:
+            raise ValueError(f"sync_interval_ms must be positive, got {sync_interval_ms}")
+        if not 0 < compact_threshold < 1:
+            raise ValueError(f"compact_threshold must be between 0 and 1, got {compact_threshold}")
+
+        self._path = path
+        self._map = BACKENDS[backend](11, function)
+        self._sync = sync
+        self._sync_interval = sync_interval_ms / 1000
+        self._compact_threshold = compact_threshold
+        # records in the log, and how many of them a compaction would drop
+        self._records = 0
+        self._dead = 0
+
+        # guards the map and the log file
+        self._lock = threading.Lock()
+        # held around an fsync outside the map lock, so the file is not swapped meanwhile
+        self._sync_lock = threading.Lock()
+        # True while the log has records that have not been fsynced
+        self._dirty = False
+        # records written while a compaction runs, copied to the end of the new log,
+        # and how many records they make dead
+        self._tail = None
+        self._tail_dead = 0
+        self._compactor = None
+        self._error = None
+
+        if os.path.exists(path):
+            self._replay()
+        self._file = open(path, 'ab')
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync == SYNC_INTERVAL:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def __enter__(self) -> "DurableHashMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Waits for a compaction in progress, writes the log to disk and closes it.
+        """
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+        with self._lock:
+            self._file.flush()
+            if self._sync != SYNC_NEVER:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        self._raise_error()
+
+    # ------------------------------------------------------------------ #
+
+    def _replay(self) -> None:
+        """
+        Applies the records of the log to the map, in order, and cuts the log off at the first
+        record that is incomplete or fails its CRC check.
+        """
+        with open(self._path, 'rb') as file:
+            end = 0
+            while True:
+                header = file.read(_CRC.size + _RECORD.size)
+                if len(header) < _CRC.size + _RECORD.size:
+                    break
+                operation, value_type, key_length, value_length = _RECORD.unpack_from(header, _CRC.size)
+                data = file.read(key_length + value_length)
+                if (len(data) < key_length + value_length or
+                        zlib.crc32(data, zlib.crc32(header[_CRC.size:])) != _CRC.unpack_from(header)[0]):
+                    break
+
+                key = data[:key_length].decode()
+                found = self._map.contains_key(key)
+                if operation == _PUT:
+                    self._map.put(key, decode_value(value_type, data[key_length:]))
+                    self._dead += found
+                else:
+                    self._map.remove(key)
+                    self._dead += 1 + found
+                self._records += 1
+                end = file.tell()
+
+        if end < os.path.getsize(self._path):
+            os.truncate(self._path, end)
+
+    def _append(self, record: bytes, dead: int) -> None:
+        """
+        Writes a record to the log, with the map lock held, counting the records it makes
+        dead, and fsyncs it under the 'always' policy.
+        """
+        self._file.write(record)
+        if self._tail is not None:
+            self._tail.append(record)
+            self._tail_dead += dead
+        self._records += 1
+        self._dead += dead
+
+        if self._sync == SYNC_ALWAYS:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        else:
+            self._dirty = True
+
+    def _compact_if_dead(self) -> None:
+        """
+        Starts a compaction, with the map lock held and the last change applied to the map,
+        once dead records pass compact_threshold of the log.
+        """
+        if (self._compactor is None and self._records >= COMPACT_MIN_RECORDS and
+                self._dead > self._compact_threshold * self._records):
+            self._start_compaction()
+
+    def sync(self) -> None:
+        """
+        Writes every record logged so far to disk, whatever the sync policy.
+        """
+        with self._sync_lock:
+            with self._lock:
+                self._file.flush()
+                self._dirty = False
+                file = self._file
+            # other threads keep writing to the log during the fsync
+            os.fsync(file.fileno())
+
+    def _flush_periodically(self) -> None:
+        """
+        Runs in the background for the 'interval' policy: fsyncs the log every sync interval
+        if anything was written to it since the last time.
+        """
+        while not self._closed.wait(self._sync_interval):
+            if self._dirty:
+                self.sync()
+
+    def _raise_error(self) -> None:
+        """
+        Raises the error of a failed background compaction, once.
+        """
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    # ------------------------------------------------------------------ #
+
+    def _start_compaction(self) -> None:
+        """
+        Starts rewriting the log in the background from the elements the map holds now,
+        with the map lock held. Records written from here on are kept in the tail as well.
+        The record counts keep describing the old log until the new one replaces it.
+        """
+        pairs = self._map.get_keys_and_values()
+        self._tail = []
+        self._tail_dead = 0
+        self._compactor = threading.Thread(target=self._compact, args=(pairs,), daemon=True)
+        self._compactor.start()
+
+    def _compact(self, pairs: DynamicArray) -> None:
+        """
+        Runs in the background: writes a new log holding a put record per element of pairs and
+        fsyncs it, then, holding the locks, adds the tail, fsyncs again and renames it over
+        the log, so a crash at any point leaves either the old log or the new one.
+        """
+        temporary_path = self._path + '.compact'
+        file = None
+        try:
+            file = open(temporary_path, 'wb')
+            for index in range(pairs.length()):
+                file.write(_record(_PUT, *pairs[index]))
+            file.flush()
+            os.fsync(file.fileno())
+
+            with self._sync_lock:
+                with self._lock:
+                    for record in self._tail:
+                        file.write(record)
+                    file.flush()
+                    os.fsync(file.fileno())
+                    os.replace(temporary_path, self._path)
+                    # the new file is the log from here on, even if the directory fsync fails,
+                    # and with file set to None the error path leaves it in place
+                    old_file, self._file, file = self._file, file, None
+                    self._records = pairs.length() + len(self._tail)
+                    self._dead = self._tail_dead
+                    self._dirty = False
+                    self._tail = None
+                    self._compactor = None
+                    old_file.close()
+                    _sync_directory(self._path)
+
+        except BaseException as error:
+            with self._lock:
+                self._error = error
+                self._tail = None
+                self._compactor = None
+            if file is not None:
+                file.close()
+                os.remove(temporary_path)
+
+    def compact(self) -> None:
+        """
+        Rewrites the log from the elements of the map now, or waits for the compaction in
+        progress, and returns once the new log has replaced the old one.
+        """
+        with self._lock:
+            if self._compactor is None:
+                self._start_compaction()
+            compactor = self._compactor
+        compactor.join()
+        self._raise_error()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Logs, then inserts or updates the key (string) with the value passed in.
+        """
+        record = _record(_PUT, key, value)
+        with self._lock:
+            self._raise_error()
+            found = self._map.contains_key(key)
+            self._append(record, found)
+            self._map.put(key, value)
+            self._compact_if_dead()
+
+    def remove(self, key: str) -> None:
+        """
+        Logs, then removes the key passed in (string) from the hash map, if it is there.
+        """
+        self.pop(key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Logs, then removes the key passed in (string) and returns its value, or default
+        (None unless given) if key is not in the hash map.
+        """
+        record = _record(_REMOVE, key)
+        with self._lock:
+            self._raise_error()
+            value = self._map.get(key, _MISSING)
+            # the removal is dead at once, and so is the put it undoes if the key was there
+            self._append(record, 1 + (value is not _MISSING))
+            if value is not _MISSING:
+                self._map.remove(key)
+            self._compact_if_dead()
+            return default if value is _MISSING else value
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), or default (None unless given)
+        if key is not in the hash map.
+        """
+        with self._lock:
+            return self._map.get(key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the map, False otherwise.
+        """
+        with self._lock:
+            return self._map.contains_key(key)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._map.get_capacity()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element.
+        """
+        with self._lock:
+            return self._map.get_keys_and_values()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("\nput / reopen example")
+    print("--------------------")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.log')
+        with DurableHashMap(path, hash_function_2, sync=SYNC_ALWAYS) as m:
+            for i in range(150):
+                m.put('key' + str(i), i * 100 if i % 2 else 'value' + str(i))
+            m.remove('key7')
+            print(m.get_size(), m.get('key5'), m.get('key6'), m.pop('key8'), m.pop('key8', 'absent'))
+
+        with DurableHashMap(path, hash_function_2) as m:
+            print(m.get_size(), m.get('key5'), m.get('key6'), m.get('key7'), m.contains_key('key8'))
+
+        print("\ncompaction example")
+        print("------------------")
+        with DurableHashMap(path, hash_function_2, sync=SYNC_NEVER) as m:
+            for i in range(5000):
+                m.put('count', i)
+            m.compact()
+            print(m.get_size(), m.get('count'), os.path.getsize(path))
@@ -0,0 +1,365 @@
+# Description: Bounded cache built on the separate chaining HashMap of hash_map_sc.py. LRUHashMap holds at most
+# max_entries elements and/or max_bytes of keys and values, evicting in O(1): the SLNodes of the buckets are threaded
+# through an intrusive doubly linked recency list, so get() moves a node to the most recent end and put() evicts from
+# the least recent end without scanning the table.
+# With the 'lfu' policy nodes are grouped by how many times they were used, the groups linked in increasing order
+# (O(1) LFU), and the least recently used node of the least used group is evicted.
+# Adds get_stats() (hits, misses and evictions) and reset_stats() to the methods of hash_map_sc.py. load() takes the
+# limits as well, since a dump does not record them.
+# contains_key() only peeks and does not count as a use.
+
+
+import sys
+
+from datastructures import DynamicArray, SLNode, hash_function_1, hash_function_2, hash_keys
+from hash_map_sc import HashMap
+
+# eviction policies
+LRU = 'lru'
+LFU = 'lfu'
+POLICIES = (LRU, LFU)
+
+
+def _entry_size(key: str, value: object) -> int:
+    """
+    Default size of an element counted against max_bytes: the shallow size of its key and value.
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+def _cache_node(key: str, value: object, key_hash: int, size: int) -> SLNode:
+    """
+    Returns a new SLNode carrying the links of a recency list: the older and newer nodes of its
+    group, the group itself and the size counted against max_bytes. The bucket code of
+    hash_map_sc.py only sees a plain SLNode.
+    """
+    node = SLNode(key, value, None, key_hash)
+    node.older = None
+    node.newer = None
+    node.group = None
+    node.size = size
+    return node
+
+
+class _Group:
+    """
+    Nodes used the same number of times, in a circular list from oldest to newest through
+    a sentinel node, and linked to the groups used less and more often.
+    """
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.lower = self
+        self.higher = self
+        self.items = _cache_node(None, None, None, 0)
+        self.items.older = self.items
+        self.items.newer = self.items
+
+
+class LRUHashMap(HashMap):
+    """
+    Separate chaining HashMap bounded to max_entries elements and/or max_bytes, as measured
+    by sizeof(key, value), that evicts the least recently used element (or, with the 'lfu'
+    policy, the least recently used of the least often used elements) to make room.
+    A value larger than max_bytes on its own is not stored.
+    """
+
+    def __init__(self,
+                 max_entries: int = None,
+                 function: callable = hash_function_1,
+                 max_bytes: int = None,
+                 policy: str = LRU,
+                 sizeof: callable = _entry_size) -> None:
+        """
+        Initialize a new bounded HashMap, sized up front for max_entries elements
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("max_entries or max_bytes must be given")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(f"max_bytes must be at least 1, got {max_bytes}")
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+
+        # at the default max load factor the table never grows past max_entries elements
+        super().__init__(max_entries or 11, function)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._sizeof = sizeof
+        self._bytes = 0
+        # sentinel of the circular list of groups, in increasing use count
+        self._groups = _Group(0)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @classmethod
+    def load(cls,
+             file,
+             function: callable = None,
+             max_entries: int = None,
+             max_bytes: int = None,
+             policy: str = LRU,
+             sizeof: callable = _entry_size) -> "LRUHashMap":
+        """
+        Returns a new map with the limits passed in, which a dump does not record, holding
+        the elements of a separate chaining dump read from a binary file object. Recency and
+        use counts are not recorded either: the elements are put in table order, evicting
+        as put() does if they do not fit. As with HashMap.load(), only load trusted dumps.
+        """
+        map = HashMap.load(file, function)
+        cache = cls(max_entries, map._hash_function, max_bytes, policy, sizeof)
+        pairs = map.get_keys_and_values()
+        cache.put_many(pairs[index] for index in range(pairs.length()))
+        return cache
+
+    def get_stats(self) -> tuple[int, int, int]:
+        """
+        Returns the (hits, misses, evictions) counted since the map was created or reset_stats()
+        was called. Hits and misses are lookups by get() and get_many().
+        """
+        return self._hits, self._misses, self._evictions
+
+    def reset_stats(self) -> None:
+        """
+        Sets the hit, miss and eviction counters back to 0.
+        """
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _append(group: _Group, node: SLNode) -> None:
+        """
+        Links a node into a group as its most recently used node.
+        """
+        sentinel = group.items
+        node.older = sentinel.older
+        node.newer = sentinel
+        sentinel.older.newer = node
+        sentinel.older = node
+        node.group = group
+
+    @staticmethod
+    def _detach(node: SLNode) -> None:
+        """
+        Unlinks a node from the list of its group.
+        """
+        node.older.newer = node.newer
+        node.newer.older = node.older
+
+    def _group_after(self, group: _Group, count: int) -> _Group:
+        """
+        Returns the group with the use count passed in, which goes right after the group
+        passed in, creating it if there is none.
+        """
+        higher = group.higher
+        if higher is not self._groups and higher.count == count:
+            return higher
+
+        new_group = _Group(count)
+        new_group.lower = group
+        new_group.higher = higher
+        group.higher = new_group
+        higher.lower = new_group
+        return new_group
+
+    @staticmethod
+    def _drop_if_empty(group: _Group) -> None:
+        """
+        Unlinks a group that has no nodes left.
+        """
+        if group.items.newer is group.items:
+            group.lower.higher = group.higher
+            group.higher.lower = group.lower
+
+    def _touch(self, node: SLNode) -> None:
+        """
+        Records a use of a node: makes it the most recently used node, in the next group
+        up under the 'lfu' policy.
+        """
+        group = node.group
+        self._detach(node)
+        if self._policy == LFU:
+            new_group = self._group_after(group, group.count + 1)
+            self._drop_if_empty(group)
+            group = new_group
+        self._append(group, node)
+
+    def _pop_node(self, key: str, key_hash: int) -> SLNode:
+        """
+        Removes and returns the node with the key from its bucket and from the recency list,
+        or None if it is not there.
+        """
+        node = super()._pop_node(key, key_hash)
+        if node is not None:
+            self._detach(node)
+            self._drop_if_empty(node.group)
+            self._bytes -= node.size
+        return node
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used node of the least used group.
+        """
+        node = self._groups.higher.items.newer
+        self._pop_node(node.key, node.hash)
+        self._size -= 1
+        self._evictions += 1
+
+    def _store(self, key: str, key_hash: int, value: object, node: SLNode) -> None:
+        """
+        Sets the value of the node passed in, or inserts a new node if it is None, counting
+        it as a use, and evicts until the map is within its limits again. New nodes are made
+        room for before they are inserted, so they are never the ones evicted.
+        """
+        size = self._sizeof(key, value)
+        if self._max_bytes is not None and size > self._max_bytes:
+            if node is not None:
+                self._pop_node(key, key_hash)
+                self._size -= 1
+            return
+
+        if node is not None:
+            self._bytes += size - node.size
+            node.value = value
+            node.size = size
+            self._touch(node)
+        else:
+            while self._size and ((self._max_entries is not None and self._size >= self._max_entries) or
+                                  (self._max_bytes is not None and self._bytes + size > self._max_bytes)):
+                self._evict()
+            self._make_room()
+            node = _cache_node(key, value, key_hash, size)
+            self._add_node(key_hash % self._capacity, node)
+            self._size += 1
+            self._bytes += size
+            self._append(self._group_after(self._groups, 1), node)
+
+        while self._max_bytes is not None and self._bytes > self._max_bytes:
+            self._evict()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts or updates the key (string) with the value passed in, making it the most
+        recently used element, and evicts elements if the map is over its limits.
+        """
+        key_hash = self._hash_function(key)
+        self._store(key, key_hash, value, self._find_node(key, key_hash))
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), making it the most recently used
+        element, or default (None unless given) if key is not in the hash map.
+        """
+        node = self._find_node(key, self._hash_function(key))
+        if node is None:
+            self._misses += 1
+            return default
+
+        self._hits += 1
+        self._touch(node)
+        return node.value
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map, counting
+        it as a use. Otherwise inserts the key with the value passed in and returns that value.
+        """
+        key_hash = self._hash_function(key)
+        node = self._find_node(key, key_hash)
+        if node is not None:
+            self._touch(node)
+            return node.value
+
+        self._store(key, key_hash, value, None)
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map. Returns the new value.
+        """
+        key_hash = self._hash_function(key)
+        node = self._find_node(key, key_hash)
+        value = function(default if node is None else node.value)
+        self._store(key, key_hash, value, node)
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in, in order,
+        evicting as put() does.
+        """
+        pairs = list(pairs)
+        key_hashes = hash_keys(self._hash_function, [pair[0] for pair in pairs])
+        for (key, value), key_hash in zip(pairs, key_hashes):
+            self._store(key, key_hash, value, self._find_node(key, key_hash))
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        Each key found counts as a use.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            node = self._find_node(key, key_hash)
+            if node is None:
+                self._misses += 1
+                values.append(default)
+            else:
+                self._hits += 1
+                self._touch(node)
+                values.append(node.value)
+        return values
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map. The counters are kept.
+        """
+        super().clear()
+        self._bytes = 0
+        self._groups = _Group(0)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nLRU example")
+    print("-----------")
+    m = LRUHashMap(3, hash_function_2)
+    for key in ('a', 'b', 'c'):
+        m.put(key, key.upper())
+    m.get('a')
+    m.put('d', 'D')
+    print(m.get_size(), m.contains_key('a'), m.contains_key('b'), m.get('missing'), m.get_stats())
+
+    print("\nLFU example")
+    print("-----------")
+    m = LRUHashMap(3, hash_function_2, policy=LFU)
+    for key in ('a', 'b', 'c'):
+        m.put(key, key.upper())
+    for _ in range(3):
+        m.get('a')
+        m.get('c')
+    m.put('d', 'D')
+    m.put('e', 'E')
+    print(m.get_size(), m.contains_key('a'), m.contains_key('b'), m.contains_key('c'), m.contains_key('d'),
+          m.get_stats())
+
+    print("\nbyte budget example")
+    print("-------------------")
+    m = LRUHashMap(function=hash_function_2, max_bytes=100, sizeof=lambda key, value: len(value))
+    for i in range(10):
+        m.put('key' + str(i), 'x' * 30)
+    m.put('huge', 'x' * 200)
+    print(m.get_size(), m.contains_key('key9'), m.contains_key('key6'), m.contains_key('huge'), m.get_stats())
@@ -0,0 +1,259 @@
+# Description: Read-only Hash Map over a file in an on-disk open addressing format, opened with mmap, so a large
+# table is built once and every later process starts using it without loading or rehashing anything.
+# write_map_file() lays the table out with the probing of hash_map_oa.py (prime capacity, Quadratic Probing, load
+# factor at most 0.5): a 64-byte header (magic, hash function id, capacity, size, heap offset and heap size), a
+# fixed-width slot per index (cached hash, heap offset, key and value lengths, state and value type), then a heap
+# holding each key (UTF-8) followed by its value (bytes, UTF-8 text, or a pickle for any other object).
+# MappedHashMap maps the file read-only and reads only the header when opened; a lookup touches the pages of the
+# slots it probes and of the one key and value it returns, so opening is immediate whatever the file size.
+# MappedHashMap has get(), contains_key(), get_many(), get_size(), get_capacity(), table_load(),
+# get_keys_and_values(), __iter__() (over HashEntry objects, as in hash_map_oa.py) and close().
+
+
+import mmap
+import os
+import struct
+
+from datastructures import (DynamicArray, HashEntry, decode_value, encode_value, hash_function_1,
+                            hash_function_2, hash_function_id, hash_keys, next_prime_capacity,
+                            resolve_hash_function)
+from hash_map_oa import MAX_LOAD_FACTOR
+
+# states of a slot, a file has no Tombstones
+EMPTY = 0
+ACTIVE = 1
+
+# cached hashes are kept to 64 bits so they fit a slot
+_MASK_64 = (1 << 64) - 1
+
+_MAGIC = b'HMMAP001'
+# header: magic, hash function id, capacity, size, heap offset, heap size, padded to 64 bytes
+_HEADER = struct.Struct('<8sQQQQQ16x')
+# slot: hash, heap offset of the key (its value follows it), key length, value length, state, value type
+_SLOT = struct.Struct('<QQIIBB6x')
+# offset of the state byte in a slot
+_STATE_OFFSET = 24
+
+
+def write_map_file(path: str, pairs, function=hash_function_1) -> None:
+    """
+    Writes a hash map, or the (key, value) pairs of the iterable passed in, to a file
+    MappedHashMap can open. A key given twice keeps its last value.
+    The file is written under a temporary name and renamed into place, so a reader never
+    opens a partly written file, and the temporary file is removed if the write fails.
+    """
+    if hasattr(pairs, 'get_keys_and_values'):
+        keys_vals = pairs.get_keys_and_values()
+        pairs = (keys_vals[index] for index in range(keys_vals.length()))
+    # a dict keeps the order of the keys and the last value of each, one passed in is used as is
+    if not isinstance(pairs, dict):
+        pairs = dict(pairs)
+    capacity = next_prime_capacity(int(len(pairs) / MAX_LOAD_FACTOR) + 1)
+    slots = bytearray(capacity * _SLOT.size)
+    heap_offset = _HEADER.size + len(slots)
+
+    temporary_path = path + '.tmp'
+    try:
+        with open(temporary_path, 'wb') as file:
+            # the heap is streamed out while the slots are filled in memory
+            file.seek(heap_offset)
+            heap_size = 0
+            for key, key_hash in zip(pairs, hash_keys(function, pairs.keys())):
+                key_bytes = key.encode()
+                value_type, value_bytes = encode_value(pairs[key])
+                key_hash &= _MASK_64
+
+                initial_index = key_hash % capacity
+                index = initial_index
+                step = 1
+                while slots[index * _SLOT.size + _STATE_OFFSET] != EMPTY:
+                    index = (initial_index + (step ** 2)) % capacity
+                    step += 1
+                _SLOT.pack_into(slots, index * _SLOT.size,
+                                key_hash, heap_size, len(key_bytes), len(value_bytes), ACTIVE, value_type)
+
+                file.write(key_bytes)
+                file.write(value_bytes)
+                heap_size += len(key_bytes) + len(value_bytes)
+
+            file.seek(_HEADER.size)
+            file.write(slots)
+            file.seek(0)
+            file.write(_HEADER.pack(_MAGIC, hash_function_id(function), capacity, len(pairs), heap_offset,
+                                    heap_size))
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary_path, path)
+    except BaseException:
+        # a failed write leaves no partial file behind
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+class MappedHashMap:
+    """
+    Read-only hash map over a file written by write_map_file(), mapped into memory.
+    The hash function is read from the file; it only has to be passed in if the file
+    was written with a function other than the sample ones.
+    """
+
+    def __init__(self, path: str, function=None) -> None:
+        """
+        Open the file at path and map it read-only
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{path!r} is not a mapped HashMap file")
+            # the mapping stays valid after the file is closed
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, function_id, capacity, size, heap_offset, heap_size = _HEADER.unpack_from(self._map)
+        try:
+            if magic != _MAGIC or len(self._map) < heap_offset + heap_size:
+                raise ValueError(f"{path!r} is not a mapped HashMap file")
+            self._hash_function = resolve_hash_function(function_id, function)
+        except ValueError:
+            self._map.close()
+            raise
+
+        if hasattr(self._map, 'madvise'):
+            # lookups jump around the file, read ahead would load pages no lookup needs
+            self._map.madvise(mmap.MADV_RANDOM)
+        self._capacity = capacity
+        self._size = size
+        self._heap_offset = heap_offset
+
+    def __enter__(self) -> "MappedHashMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the file.
+        """
+        self._map.close()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the table load factor, the average number of elements per index.
+        """
+        return self._size / self._capacity
+
+    def _lookup(self, key: str, key_hash: int) -> tuple:
+        """
+        Runs the quadratic probe sequence for the key and returns the (heap offset, key length,
+        value length, value type) of its slot, or None if the key is not in the file.
+        """
+        key_bytes = key.encode()
+        key_hash &= _MASK_64
+        initial_index = key_hash % self._capacity
+        new_index = initial_index
+        step = 1
+        while True:
+            slot_hash, offset, key_length, value_length, state, value_type = \
+                _SLOT.unpack_from(self._map, _HEADER.size + new_index * _SLOT.size)
+            if state == EMPTY:
+                return None
+
+            start = self._heap_offset + offset
+            if (slot_hash == key_hash and key_length == len(key_bytes) and
+                    self._map[start:start + key_length] == key_bytes):
+                return offset, key_length, value_length, value_type
+
+            new_index = (initial_index + (step ** 2)) % self._capacity
+            step += 1
+
+    def _value(self, offset: int, key_length: int, value_length: int, value_type: int) -> object:
+        """
+        Returns the value stored in the heap after the key at offset.
+        """
+        start = self._heap_offset + offset + key_length
+        return decode_value(value_type, self._map[start:start + value_length])
+
+    # ------------------------------------------------------------------ #
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        slot = self._lookup(key, self._hash_function(key))
+        return default if slot is None else self._value(*slot)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the map, False otherwise.
+        """
+        return self._lookup(key, self._hash_function(key)) is not None
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            slot = self._lookup(key, key_hash)
+            values.append(default if slot is None else self._value(*slot))
+        return values
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element.
+        """
+        keys_vals = DynamicArray()
+        for element in self:
+            keys_vals.append((element.key, element.value))
+        return keys_vals
+
+    def __iter__(self):
+        """
+        Returns an iterator over the elements as HashEntry objects, in slot order.
+        """
+        for index in range(self._capacity):
+            slot_hash, offset, key_length, value_length, state, value_type = \
+                _SLOT.unpack_from(self._map, _HEADER.size + index * _SLOT.size)
+            if state == ACTIVE:
+                start = self._heap_offset + offset
+                key = str(self._map[start:start + key_length], 'utf-8')
+                yield HashEntry(key, self._value(offset, key_length, value_length, value_type), slot_hash)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("\nwrite / open example")
+    print("--------------------")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.bin')
+        write_map_file(path, (('key' + str(i), i * 100 if i % 2 else 'value' + str(i)) for i in range(150)),
+                       hash_function_2)
+        with MappedHashMap(path) as m:
+            print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.get('key5'), m.get('key6'))
+            print(m.contains_key('key149'), m.contains_key('key150'), m.get('key150', 'absent'))
+            values = m.get_many(['key1', 'key2', 'missing'], -1)
+            print([values[i] for i in range(values.length())], len(list(m)))
+
+        try:
+            MappedHashMap(path, hash_function_1)
+        except ValueError as error:
+            print(error)
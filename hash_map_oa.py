@@ -7,20 +7,50 @@
 # pair.
 # Includes the following methods: put() (insert key/value), resize_table(), table_load(), empty_buckets(),
 # get(), contains_key(), remove(), get_keys_and_values() (returns Dynamic Array containing tuples of key/value pairs),
-# clear(), __iter__() to enable iteration and initialize an index variable, and __next__() to return active elements.
-
-
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
-                        hash_function_1, hash_function_2)
+# compact() (drops Tombstones in place), shrink_to_fit(), get_load_factors(), set_load_factors(), clear(),
+# __iter__() to enable iteration and initialize an index variable, and __next__() to return active elements.
+# Also includes the single-probe methods pop(), setdefault() and update_with() (read-modify-write of a value),
+# and the bulk methods put_many(), get_many() and remove_many().
+# dump() writes the table layout with cached hashes to a binary file, optionally gzip compressed, and HashMap.load()
+# reads it back without rehashing.
+# PowerOfTwoHashMap is a variant with power-of-two capacity, bitmask indexing and triangular probing,
+# IncrementalHashMap is a variant that spreads the work of growing the table over the operations that follow, and
+# SnapshotHashMap is a variant whose readers never lock, with snapshot() returning a frozen read-only SnapshotView.
+
+
+import pickle
+import threading
+
+from datastructures import (DUMP_CHUNK, DynamicArray, DynamicArrayException, HashEntry,
+                            dump_stream, hash_function_1, hash_function_2, hash_function_id,
+                            hash_keys, load_stream, mix_hash, next_prime_capacity,
+                            resolve_hash_function)
+
+# defaults for the load factor thresholds and the growth of the table, settable per map:
+# the load factor, counting Tombstones, stays at or below MAX_LOAD_FACTOR after an insertion,
+# the table halves once the load factor drops below MIN_LOAD_FACTOR, down to its initial
+# capacity, and grows GROWTH_FACTOR times when full
+MAX_LOAD_FACTOR = 0.5
+MIN_LOAD_FACTOR = 0.125
+GROWTH_FACTOR = 2.0
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    # a quadratic probe sequence on a prime capacity reaches only half of the buckets,
+    # so a higher load could leave a probe sequence without an empty bucket
+    _max_load_limit = 0.5
+
+    def __init__(self, capacity: int, function,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        with the load factor thresholds and growth factor passed in
         """
+        self._check_load_factors(max_load_factor, min_load_factor, growth_factor)
+
         self._buckets = DynamicArray()
 
         # capacity must be a prime number
@@ -30,6 +60,19 @@ class HashMap:
 
         self._hash_function = function
         self._size = 0
+        self._tombstones = 0
+        # removals never shrink the table below the capacity it was created with
+        self._min_capacity = self._capacity
+        self._max_load_factor = max_load_factor
+        self._min_load_factor = min_load_factor
+        self._growth_factor = growth_factor
+
+    @classmethod
+    def with_expected_size(cls, count: int, function=hash_function_1) -> "HashMap":
+        """
+        Returns a new HashMap with capacity for count elements within the default max load factor.
+        """
+        return cls(int(count / MAX_LOAD_FACTOR) + 1, function)
 
     def __str__(self) -> str:
         """
@@ -43,16 +86,10 @@ class HashMap:
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Find the closest prime number at or above the given number,
+        picked from the precomputed PRIME_CAPACITIES instead of testing candidates
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime_capacity(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
@@ -88,66 +125,217 @@ class HashMap:
         """
         return self._capacity
 
+    def get_load_factors(self) -> tuple[float, float, float]:
+        """
+        Returns the (max_load_factor, min_load_factor, growth_factor) of the map
+        """
+        return self._max_load_factor, self._min_load_factor, self._growth_factor
+
+    def set_load_factors(self, max_load_factor: float = None, min_load_factor: float = None,
+                         growth_factor: float = None) -> None:
+        """
+        Changes the load factor thresholds and growth factor passed in (None keeps the
+        current one), then resizes the table right away if the current load is outside
+        the new thresholds. Raises ValueError, changing nothing, for invalid settings.
+        """
+        max_load_factor = self._max_load_factor if max_load_factor is None else max_load_factor
+        min_load_factor = self._min_load_factor if min_load_factor is None else min_load_factor
+        growth_factor = self._growth_factor if growth_factor is None else growth_factor
+        self._check_load_factors(max_load_factor, min_load_factor, growth_factor)
+
+        self._max_load_factor = max_load_factor
+        self._min_load_factor = min_load_factor
+        self._growth_factor = growth_factor
+
+        if self._size + self._tombstones > self._max_load_factor * self._capacity:
+            self.resize_table(int(self._size / self._max_load_factor) + 1)
+        else:
+            self._release_room()
+
+    def _check_load_factors(self, max_load_factor: float, min_load_factor: float,
+                            growth_factor: float) -> None:
+        """
+        Raises ValueError unless 0 < max_load_factor <= the limit of the probing scheme
+        (and below 1.0), growth_factor > 1, and min_load_factor is low enough that neither
+        halving nor growing the table lands on the other threshold.
+        """
+        if not 0 < max_load_factor < 1.0:
+            raise ValueError(f"max_load_factor must be above 0 and below 1.0, got {max_load_factor}")
+        if max_load_factor > self._max_load_limit:
+            raise ValueError(f"max_load_factor must be at most {self._max_load_limit} with this "
+                             f"probing scheme, got {max_load_factor}")
+        if not growth_factor > 1:
+            raise ValueError(f"growth_factor must be above 1, got {growth_factor}")
+        if not 0 <= min_load_factor * max(2, growth_factor) < max_load_factor:
+            raise ValueError(f"min_load_factor must be at least 0 and below max_load_factor / "
+                             f"max(2, growth_factor), got {min_load_factor}")
+
     # ------------------------------------------------------------------ #
 
     def put(self, key: str, value: object) -> None:
         """
         Inserts a new element into the hash map if the key is not in the hash map.
         If the key is in the hash map, updates the key with new value.
-        Maintains table load factor of less than 0.5 by resizing the table with resize_table().
+        Maintains table load factor, counting Tombstones, of at most max_load_factor by resizing
+        the table with resize_table(), or by compacting it in place when Tombstones dominate.
         Increases the size of the hash map when inserting a new value or if it is a Tombstone value.
         """
-        if self.table_load() >= 0.5:
-            self.resize_table(2 * self._capacity)
+        key_hash = self._hash_function(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+
+        # updates value if key already in map
+        if found:
+            self._set_value(index, value)
+        else:
+            self._insert_at(index, key, key_hash, value)
 
-        initial_index = self._hash_function(key) % self._capacity
+    def _make_room(self) -> None:
+        """
+        Keeps the load factor, counting Tombstones, at most max_load_factor after a possible
+        insertion, so a probe sequence always ends at an empty bucket.
+        Rebuilds the table at the same capacity when Tombstones dominate, else grows it.
+        """
+        if self._size + self._tombstones + 1 > self._max_load_factor * self._capacity:
+            if self._tombstones >= self._size and self._size + 1 <= self._max_load_factor * self._capacity:
+                # mostly dead entries, rebuilding at the same capacity frees enough buckets
+                self.compact()
+            else:
+                self.resize_table(self._grown_capacity())
+
+    def _grown_capacity(self) -> int:
+        """
+        Returns growth_factor times the capacity, and at least one more than the capacity
+        and enough to hold one more element within max_load_factor.
+        """
+        return max(int(self._capacity * self._growth_factor), self._capacity + 1,
+                   int((self._size + 1) / self._max_load_factor) + 1)
+
+    def _release_room(self) -> None:
+        """
+        Halves the table, as many times as needed, while the load factor is below
+        min_load_factor and the capacity is above the initial one. The halving stops with the
+        load between min_load_factor and twice it (a little lower once the capacity is rounded
+        up to a prime), or lower still when it stops at the initial capacity. Either way the
+        load stays below max_load_factor, which the settings keep above twice min_load_factor,
+        so a map hovering around a threshold does not resize back and forth.
+        """
+        new_capacity = self._capacity
+        while new_capacity > self._min_capacity and self._size < self._min_load_factor * new_capacity:
+            new_capacity //= 2
+
+        if new_capacity < self._capacity:
+            self.resize_table(max(new_capacity, self._min_capacity))
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the quadratic probe sequence for the key once.
+        Returns (index, True) for the bucket holding the active key, otherwise (index, False)
+        for the bucket the key should be inserted at: the first Tombstone passed on the way,
+        or the empty bucket that ended the probe.
+        Probing continues past Tombstones so a key further along is never inserted twice.
+        """
+        initial_index = key_hash % self._capacity
         new_index = initial_index
         step = 1
+        tombstone_index = None
+
+        while self._buckets[new_index] is not None:
+            element = self._buckets[new_index]
+            if element.is_tombstone:
+                if tombstone_index is None:
+                    tombstone_index = new_index
+            elif element.hash == key_hash and element.key == key:
+                return new_index, True
 
-        while self._buckets[new_index] is not None and not self._buckets[new_index].is_tombstone and self._buckets[
-            new_index].key != key:
             # quadratic probing for next available index
             new_index = (initial_index + (step ** 2)) % self._capacity
             step += 1
 
-        # inserts new HashEntry with key, value and Tombstone to False
-        if self._buckets[new_index] is None or self._buckets[new_index].is_tombstone:
-            self._size += 1
-            self._buckets[new_index] = HashEntry(key, value)
+        if tombstone_index is not None:
+            return tombstone_index, False
+        return new_index, False
 
-        # updates value and Tombstone boolean if key already in map
-        elif self._buckets[new_index].key == key:
-            self._buckets[new_index].value = value
-            self._buckets[new_index].is_tombstone = False
+    def _set_value(self, index: int, value: object) -> None:
+        """
+        Replaces the value of the active element at an index returned by _find_slot().
+        """
+        self._buckets[index].value = value
+
+    def _insert_at(self, index: int, key: str, key_hash: int, value: object) -> None:
+        """
+        Inserts new HashEntry with key, value, cached hash and Tombstone to False at an
+        index returned by _find_slot(), reusing the Tombstone there if there is one.
+        """
+        if self._buckets[index] is not None:
+            self._tombstones -= 1
+        self._size += 1
+        self._buckets[index] = HashEntry(key, value, key_hash)
 
     def resize_table(self, new_capacity: int) -> None:
         """
         Resizes the hash map with the new capacity (integer) variable passed in,
-        which is double the old capacity.
-        Checks that the new capacity is a prime number, else utilizes the
-        is_prime() and next_prime() methods to calculate and set that as the new capacity.
-        Creates a new hash table and uses indirect recursion to insert active elements and
-        their key/value by utilizing the put() method.
+        which is growth_factor times the old capacity when growing and half of it when shrinking.
+        Rounds the new capacity up to the closest prime number with next_prime().
+        Builds the new hash table in a single pass, moving the existing HashEntry objects
+        straight into their new buckets from their cached hash (no put() calls, no duplicate
+        key checks since the old table cannot hold duplicates).
         """
         if new_capacity < self._size:
             return
 
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        new_capacity = self._next_prime(new_capacity)
+
+        # keep growing while the elements would not fit within max_load_factor,
+        # matching the growth put() applies when re-inserting
+        while self._size > self._max_load_factor * new_capacity:
+            new_capacity = self._next_prime(max(int(new_capacity * self._growth_factor), new_capacity + 1))
+
+        new_table = DynamicArray()
+        for index in range(new_capacity):
+            new_table.append(None)
+
+        for index in range(self._buckets.length()):
+            element = self._buckets[index]
+            # only move elements that have a key/value, ignore Tombstone placements
+            if element is None or element.is_tombstone:
+                continue
 
+            new_table[self._probe_free(new_table, new_capacity, element.hash)] = element
+
+        # the old table stays intact until the new one is complete
+        self._buckets = new_table
         self._capacity = new_capacity
-        old_table = self._buckets
-        self._buckets = DynamicArray()
-        self._size = 0
+        self._tombstones = 0
 
-        for index in range(self._capacity):
-            self._buckets.append(None)
+    @staticmethod
+    def _probe_free(table: DynamicArray, capacity: int, key_hash: int) -> int:
+        """
+        Returns the first empty bucket on the quadratic probe sequence of the hash in a
+        table being rebuilt, which holds no Tombstones and no duplicate keys.
+        """
+        initial_index = key_hash % capacity
+        new_index = initial_index
+        step = 1
+        while table[new_index] is not None:
+            new_index = (initial_index + (step ** 2)) % capacity
+            step += 1
+        return new_index
 
-        for index in range(old_table.length()):
-            element = old_table[index]
-            # only insert elements that have a key/value, ignore Tombstone placements
-            if element is not None and not element.is_tombstone:
-                self.put(element.key, element.value)
+    def compact(self) -> None:
+        """
+        Rebuilds the hash map in place at its current capacity, dropping every Tombstone.
+        put() does this on its own when Tombstones outnumber active elements, but it can
+        also be called explicitly, e.g. off-peak after a large batch of removals.
+        """
+        self.resize_table(self._capacity)
+
+    def shrink_to_fit(self) -> None:
+        """
+        Rebuilds the hash map at the smallest capacity that holds its elements within
+        max_load_factor, dropping every Tombstone, regardless of the initial capacity.
+        """
+        self.resize_table(int(self._size / self._max_load_factor) + 1)
 
     def table_load(self) -> float:
         """
@@ -167,55 +355,160 @@ class HashMap:
 
         return empty_buckets
 
-    def get(self, key: str) -> object:
+    def get(self, key: str, default: object = None) -> object:
         """
         Retrieves and returns the value (object) that corresponds with the key (string) passed in.
-        Returns None if key is not in the hash map.
+        Returns default (None unless given) if key is not in the hash map.
         """
-        initial_index = self._hash_function(key) % self._capacity
-        new_index = initial_index
-        step = 1
-
-        while self._buckets[new_index]:
-            if self._buckets[new_index].key == key and not self._buckets[new_index].is_tombstone:
-                return self._buckets[new_index].value
-            new_index = (initial_index + step ** 2) % self._capacity
-            step += 1
-        return None
+        index, found = self._find_slot(key, self._hash_function(key))
+        if found:
+            return self._buckets[index].value
+        return default
 
     def contains_key(self, key: str) -> bool:
         """
-        Utilizes the get() method to determine if the key (string) passed in is in
-        the hash map.
+        Probes for the key (string) passed in once to determine if it is in the hash map.
         Returns True if key is in the map, False otherwise.
         """
         if self._size == 0:
             return False
 
-        if self.get(key):
-            return True
-        return False
+        return self._find_slot(key, self._hash_function(key))[1]
 
     def remove(self, key: str) -> None:
         """
         Removes the key passed in (string) from the hash map, decreases the map's size by 1.
         Tombstone value is set to True to indicate the removed element.
         """
-        initial_index = self._hash_function(key) % self._capacity
-        new_index = initial_index
-        step = 1
+        self.pop(key)
 
-        if not self.contains_key(key):
-            return
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map with a single probe and returns
+        its value, or default (None unless given) if key is not in the hash map.
+        Shrinks the table once the load factor drops below min_load_factor.
+        """
+        index, found = self._find_slot(key, self._hash_function(key))
+        if not found:
+            return default
 
-        while self._buckets[new_index]:
-            if self._buckets[new_index].key == key and not self._buckets[new_index].is_tombstone:
-                # removed values become Tombstones but key/value remains same until changed
-                self._buckets[new_index].is_tombstone = True
-                self._size -= 1
-                return
-            new_index = (initial_index + step ** 2) % self._capacity
-            step += 1
+        value = self._remove_at(index)
+        self._release_room()
+        return value
+
+    def _remove_at(self, index: int) -> object:
+        """
+        Turns the active element at an index returned by _find_slot() into a Tombstone
+        and returns its value.
+        """
+        # removed values become Tombstones but key/value remains same until changed
+        element = self._buckets[index]
+        element.is_tombstone = True
+        self._size -= 1
+        self._tombstones += 1
+        return element.value
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        Hashes and probes for the key once.
+        """
+        key_hash = self._hash_function(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+        if found:
+            return self._buckets[index].value
+
+        self._insert_at(index, key, key_hash, value)
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map, e.g. update_with(key, lambda n: n + 1, 0)
+        to count. Hashes and probes for the key once, and returns the new value.
+        """
+        key_hash = self._hash_function(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+        if found:
+            value = function(self._buckets[index].value)
+            self._set_value(index, value)
+            return value
+
+        value = function(default)
+        self._insert_at(index, key, key_hash, value)
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in.
+        The keys are hashed together and the table is sized once for the keys that are new,
+        so no load checks or intermediate resizes happen per pair.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        key_hashes = hash_keys(self._hash_function, keys)
+        if self._size:
+            # the keys already in the map are updated in place first, so the table is sized
+            # for the new keys only; every pair of a new key is kept, in order, for below
+            new_pairs = []
+            for (key, value), key_hash in zip(pairs, key_hashes):
+                index, found = self._find_slot(key, key_hash)
+                if found:
+                    self._set_value(index, value)
+                else:
+                    new_pairs.append(((key, value), key_hash))
+            new_keys = {key for (key, value), key_hash in new_pairs}
+        else:
+            # in an empty map every key is new
+            new_pairs = zip(pairs, key_hashes)
+            new_keys = set(keys)
+
+        self.reserve(self._size + len(new_keys))
+        for (key, value), key_hash in new_pairs:
+            index, found = self._find_slot(key, key_hash)
+            if found:
+                self._set_value(index, value)
+            else:
+                self._insert_at(index, key, key_hash, value)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            index, found = self._find_slot(key, key_hash)
+            values.append(self._buckets[index].value if found else default)
+        return values
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            index, found = self._find_slot(key, key_hash)
+            values.append(self._remove_at(index) if found else default)
+
+        self._release_room()
+        return values
+
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count elements fit within max_load_factor,
+        counting the Tombstones currently in the table (the resize drops them).
+        Call before inserting a known number of elements to avoid repeated growth.
+        """
+        if self._tombstones + count > self._max_load_factor * self._capacity:
+            self.resize_table(int(count / self._max_load_factor) + 1)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -233,12 +526,99 @@ class HashMap:
     def clear(self) -> None:
         """
         Deletes all elements from the hash map, creating buckets with None.
-        Size becomes 0, but underlying capacity remains the same.
+        Size becomes 0, and capacity returns to the capacity the map was created with.
         """
+        self._capacity = self._min_capacity
         self._buckets = DynamicArray()
         for index in range(self._capacity):
             self._buckets.append(None)
         self._size = 0
+        self._tombstones = 0
+
+    def _dump_settings(self) -> dict:
+        """
+        Returns the settings of a subclass, beyond those every HashMap has, that dump()
+        records so that load() can create the map with them again.
+        """
+        return {}
+
+    @classmethod
+    def _load_settings(cls, settings: dict) -> dict:
+        """
+        Returns the keyword arguments of the constructor for the settings a dump recorded
+        with _dump_settings(), leaving out any this class does not take.
+        """
+        return {}
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object as it is laid out: each element with its
+        index and cached hash, Tombstones included, so load() puts every element back where
+        it was without hashing a key or probing. Buckets are pickled DUMP_CHUNK at a time,
+        gzip compressed if compress. Keys and values must be picklable.
+        """
+        settings = {
+            'capacity': self._capacity,
+            'size': self._size,
+            'tombstones': self._tombstones,
+            'min_capacity': self._min_capacity,
+            'load_factors': self.get_load_factors(),
+            'function': hash_function_id(self._hash_function),
+            'extra': self._dump_settings(),
+        }
+        with dump_stream(file, 'oa', compress) as stream:
+            pickle.dump(settings, stream, pickle.HIGHEST_PROTOCOL)
+            for start in range(0, self._capacity, DUMP_CHUNK):
+                indices, hashes, keys, values = [], [], [], []
+                tombstones = bytearray()
+                for index in range(start, min(start + DUMP_CHUNK, self._capacity)):
+                    element = self._buckets[index]
+                    if element is None:
+                        continue
+                    indices.append(index)
+                    tombstones.append(element.is_tombstone)
+                    # a Tombstone only has to keep probe sequences going, not its key and value
+                    if element.is_tombstone:
+                        element = _MOVED
+                    hashes.append(element.hash)
+                    keys.append(element.key)
+                    values.append(element.value)
+                pickle.dump((indices, hashes, keys, values, bytes(tombstones)), stream, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(None, stream, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file, function=None) -> "HashMap":
+        """
+        Returns a new map with the table written by dump(), read from a binary file object
+        one chunk at a time. The hash function is the one recorded in the dump, and only
+        has to be passed in if it is not one of the sample hash functions.
+        Raises ValueError if the file does not hold a dump of a table with this probing.
+        The dump is read with pickle, which can run arbitrary code, so only load dumps from
+        a trusted source.
+        """
+        with load_stream(file, 'oa') as stream:
+            settings = pickle.load(stream)
+            max_load_factor, min_load_factor, growth_factor = settings['load_factors']
+            map = cls(settings['capacity'], resolve_hash_function(settings['function'], function),
+                      max_load_factor=max_load_factor, min_load_factor=min_load_factor,
+                      growth_factor=growth_factor, **cls._load_settings(settings.get('extra', {})))
+            if map._capacity != settings['capacity']:
+                raise ValueError(f"dump of a table with capacity {settings['capacity']}, "
+                                 f"which {cls.__name__} cannot probe")
+
+            chunk = pickle.load(stream)
+            while chunk is not None:
+                for index, key_hash, key, value, is_tombstone in zip(*chunk):
+                    if is_tombstone:
+                        map._buckets[index] = _MOVED
+                    else:
+                        map._buckets[index] = HashEntry(key, value, key_hash)
+                chunk = pickle.load(stream)
+
+        map._size = settings['size']
+        map._tombstones = settings['tombstones']
+        map._min_capacity = settings['min_capacity']
+        return map
 
     def __iter__(self):
         """
@@ -268,6 +648,574 @@ class HashMap:
         return element
 
 
+# old buckets IncrementalHashMap moves into the new table per operation while resizing
+REHASH_STEPS = 4
+
+# a Tombstone without key or value: left in the old table where IncrementalHashMap moved an
+# element out, so probe sequences through that bucket still continue past it, and put back
+# by load() for each Tombstone of a dumped table
+_MOVED = HashEntry(None, None)
+_MOVED.is_tombstone = True
+
+
+class IncrementalHashMap(HashMap):
+    """
+    HashMap variant that grows its table incrementally, like Redis dictionaries.
+    When put() crosses the load factor, a new table is allocated but the elements stay in
+    the old one; every following operation moves up to rehash_steps active elements into
+    the new table, and a key found in the old table is moved over on the spot, so callers
+    always get an index into the new table. No single operation pays for rehashing the
+    whole map.
+    Explicit calls to resize_table(), compact() and reserve(), and whole-map operations such
+    as get_keys_and_values() and iteration, finish any resize in progress first.
+    """
+
+    def __init__(self, capacity: int, function, rehash_steps: int = REHASH_STEPS,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision resolution
+        and moves rehash_steps elements per operation while resizing
+        """
+        super().__init__(capacity, function, max_load_factor, min_load_factor, growth_factor)
+        self._rehash_steps = rehash_steps
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output, finishing any resize first
+        """
+        self._finish_rehash()
+        return super().__str__()
+
+    # ------------------------------------------------------------------ #
+
+    def _make_room(self) -> None:
+        """
+        Keeps the load factor, counting Tombstones, at most max_load_factor after a possible
+        insertion. Compacts in place when Tombstones dominate, else starts moving to a table
+        growth_factor times the capacity. A resize still in progress is finished first.
+        """
+        if self._size + self._tombstones + 1 > self._max_load_factor * self._capacity:
+            self._finish_rehash()
+            if self._tombstones >= self._size and self._size + 1 <= self._max_load_factor * self._capacity:
+                self.compact()
+            else:
+                self._start_rehash(self._grown_capacity())
+
+    def _start_rehash(self, new_capacity: int) -> None:
+        """
+        Allocates the new table and keeps the current one as the old table, to be moved over
+        by _rehash_step().
+        """
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._rehash_index = 0
+
+        self._capacity = self._next_prime(new_capacity)
+        self._buckets = DynamicArray()
+        for index in range(self._capacity):
+            self._buckets.append(None)
+        self._tombstones = 0
+
+    def _rehash_step(self, steps: int = None) -> None:
+        """
+        Moves up to steps (rehash_steps unless given) active elements from the old table into
+        the new one, visiting at most ten times as many buckets so a run of empty ones stays cheap.
+        """
+        if self._old_buckets is None:
+            return
+
+        moves = self._rehash_steps if steps is None else steps
+        visits = 10 * moves
+        old_table = self._old_buckets
+        while moves and visits and self._rehash_index < self._old_capacity:
+            element = old_table[self._rehash_index]
+            if element is not None and not element.is_tombstone:
+                self._buckets[self._probe_free(self._buckets, self._capacity, element.hash)] = element
+                moves -= 1
+            self._rehash_index += 1
+            visits -= 1
+
+        if self._rehash_index == self._old_capacity:
+            self._old_buckets = None
+
+    def _finish_rehash(self) -> None:
+        """
+        Moves every remaining element of the old table into the new one.
+        """
+        if self._old_buckets is not None:
+            self._rehash_step(self._old_capacity)
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the probe sequence for the key in the new table, and in the old table while
+        resizing. A key found in the old table is moved into the new table first, so the
+        index returned always refers to the new table.
+        """
+        self._rehash_step()
+        index, found = super()._find_slot(key, key_hash)
+        if found or self._old_buckets is None:
+            return index, found
+
+        old_table = self._old_buckets
+        initial_index = key_hash % self._old_capacity
+        old_index = initial_index
+        step = 1
+        while old_table[old_index] is not None and step <= self._old_capacity:
+            element = old_table[old_index]
+            # elements before the rehash index have already been moved
+            if (old_index >= self._rehash_index and not element.is_tombstone and
+                    element.hash == key_hash and element.key == key):
+                old_table[old_index] = _MOVED
+                if self._buckets[index] is not None:
+                    self._tombstones -= 1
+                self._buckets[index] = element
+                return index, True
+
+            old_index = (initial_index + (step ** 2)) % self._old_capacity
+            step += 1
+
+        return index, False
+
+    # ------------------------------------------------------------------ #
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Finishes any resize in progress, then resizes the hash map right away.
+        """
+        self._finish_rehash()
+        super().resize_table(new_capacity)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that are either None or a Tombstone,
+        finishing any resize first.
+        """
+        self._finish_rehash()
+        return super().empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element, finishing any resize first.
+        """
+        self._finish_rehash()
+        return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, dropping the old table of a resize in progress.
+        """
+        self._old_buckets = None
+        super().clear()
+
+    def _dump_settings(self) -> dict:
+        """
+        Records rehash_steps in a dump.
+        """
+        return {**super()._dump_settings(), 'rehash_steps': self._rehash_steps}
+
+    @classmethod
+    def _load_settings(cls, settings: dict) -> dict:
+        """
+        Passes the rehash_steps recorded in a dump to the constructor.
+        """
+        arguments = super()._load_settings(settings)
+        if 'rehash_steps' in settings:
+            arguments['rehash_steps'] = settings['rehash_steps']
+        return arguments
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object, finishing any resize first.
+        """
+        self._finish_rehash()
+        super().dump(file, compress)
+
+    def __iter__(self):
+        """
+        Enables iteration (for i in map), finishing any resize first.
+        """
+        self._finish_rehash()
+        return super().__iter__()
+
+
+class SnapshotView:
+    """
+    Read-only view of the table of a SnapshotHashMap at one point in time.
+    Holds the bucket array, capacity and size together, so a lookup never mixes a table
+    with the capacity of another one, and needs no locking.
+    """
+
+    def __init__(self, buckets: DynamicArray, capacity: int, size: int, function) -> None:
+        """
+        Initialize a view of a bucket array of the capacity passed in
+        """
+        self._buckets = buckets
+        self._capacity = capacity
+        self._size = size
+        self._hash_function = function
+
+    def get_size(self) -> int:
+        """
+        Return size of the map when the view was taken
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of the map when the view was taken
+        """
+        return self._capacity
+
+    def _lookup(self, key: str, key_hash: int) -> HashEntry:
+        """
+        Runs the quadratic probe sequence for the key and returns its active HashEntry,
+        or None if the key is not in the view.
+        """
+        initial_index = key_hash % self._capacity
+        new_index = initial_index
+        step = 1
+        while self._buckets[new_index] is not None:
+            element = self._buckets[new_index]
+            if not element.is_tombstone and element.hash == key_hash and element.key == key:
+                return element
+
+            new_index = (initial_index + (step ** 2)) % self._capacity
+            step += 1
+
+        return None
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), or default (None unless given)
+        if key is not in the view.
+        """
+        element = self._lookup(key, self._hash_function(key))
+        return default if element is None else element.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the view, False otherwise.
+        """
+        return self._lookup(key, self._hash_function(key)) is not None
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the view.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            element = self._lookup(key, key_hash)
+            values.append(default if element is None else element.value)
+        return values
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element of the view.
+        """
+        keys_vals = DynamicArray()
+        for element in self:
+            keys_vals.append((element.key, element.value))
+        return keys_vals
+
+    def __iter__(self):
+        """
+        Returns an iterator over the active HashEntry objects of the view.
+        """
+        for index in range(self._capacity):
+            element = self._buckets[index]
+            if element is not None and not element.is_tombstone:
+                yield element
+
+
+class SnapshotHashMap(HashMap):
+    """
+    HashMap variant for read-mostly workloads shared between threads, RCU style.
+    Writers are serialized by a lock and only ever store whole new HashEntry objects into
+    the table (entries are never changed in place), and resizes build the complete new
+    table before publishing it, together with its capacity, as a new SnapshotView.
+    Readers go through the published view without any locking, so they never block and
+    never see a half-built table; a reader running during a write sees the map either
+    before or after that write.
+    snapshot() returns a view that stays frozen: the table is marked shared, and the next
+    write copies it once before changing anything (copy-on-write).
+    """
+
+    def __init__(self, capacity: int, function,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision resolution
+        and publishes its table to lock-free readers
+        """
+        super().__init__(capacity, function, max_load_factor, min_load_factor, growth_factor)
+        # reentrant, since writes such as put() call resize_table()
+        self._write_lock = threading.RLock()
+        # True while the table is also held by a view returned from snapshot()
+        self._shared = False
+        self._published = None
+        self._publish()
+
+    def _publish(self) -> None:
+        """
+        Makes the current table visible to readers with a single reference assignment.
+        """
+        self._published = SnapshotView(self._buckets, self._capacity, self._size, self._hash_function)
+
+    def _unshare(self) -> None:
+        """
+        Copies the table before a write if a snapshot still holds it.
+        Entries are never changed in place, so copying the bucket array is enough.
+        """
+        if self._shared:
+            buckets = DynamicArray()
+            for index in range(self._capacity):
+                buckets.append(self._buckets[index])
+            self._buckets = buckets
+            self._shared = False
+
+    def snapshot(self) -> SnapshotView:
+        """
+        Returns a read-only SnapshotView of the map as it is now, unaffected by later writes.
+        Taking a snapshot costs O(1); the next write pays for one copy of the table.
+        """
+        with self._write_lock:
+            self._shared = True
+            return SnapshotView(self._buckets, self._capacity, self._size, self._hash_function)
+
+    # ------------------------------------------------------------------ #
+
+    def _set_value(self, index: int, value: object) -> None:
+        """
+        Replaces the active element at an index with a new HashEntry holding the value.
+        """
+        element = self._buckets[index]
+        self._buckets[index] = HashEntry(element.key, value, element.hash)
+
+    def _remove_at(self, index: int) -> object:
+        """
+        Replaces the active element at an index with a new Tombstone and returns its value.
+        """
+        element = self._buckets[index]
+        tombstone = HashEntry(element.key, element.value, element.hash)
+        tombstone.is_tombstone = True
+        self._buckets[index] = tombstone
+        self._size -= 1
+        self._tombstones += 1
+        return element.value
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts or updates the key (string) with the value passed in, under the write lock.
+        """
+        with self._write_lock:
+            self._unshare()
+            super().put(key, value)
+            self._publish()
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) under the write lock and returns its value,
+        or default (None unless given) if key is not in the hash map.
+        """
+        with self._write_lock:
+            self._unshare()
+            value = super().pop(key, default)
+            self._publish()
+            return value
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), inserting value first if the key
+        is not in the hash map, under the write lock.
+        """
+        with self._write_lock:
+            self._unshare()
+            value = super().setdefault(key, value)
+            self._publish()
+            return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), or inserts
+        function(default), under the write lock. Returns the new value.
+        """
+        with self._write_lock:
+            self._unshare()
+            value = super().update_with(key, function, default)
+            self._publish()
+            return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in, under the write lock.
+        """
+        pairs = list(pairs)
+        with self._write_lock:
+            self._unshare()
+            super().put_many(pairs)
+            self._publish()
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in under the write lock and returns a dynamic
+        array with the removed values.
+        """
+        keys = list(keys)
+        with self._write_lock:
+            self._unshare()
+            values = super().remove_many(keys, default)
+            self._publish()
+            return values
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Builds the table at the new capacity under the write lock, then publishes it.
+        """
+        with self._write_lock:
+            super().resize_table(new_capacity)
+            self._shared = False
+            self._publish()
+
+    def set_load_factors(self, max_load_factor: float = None, min_load_factor: float = None,
+                         growth_factor: float = None) -> None:
+        """
+        Changes the load factor thresholds and growth factor under the write lock.
+        """
+        with self._write_lock:
+            super().set_load_factors(max_load_factor, min_load_factor, growth_factor)
+
+    def clear(self) -> None:
+        """
+        Publishes a new, empty table at the initial capacity.
+        """
+        with self._write_lock:
+            super().clear()
+            self._shared = False
+            self._publish()
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object under the write lock; readers carry on.
+        """
+        with self._write_lock:
+            super().dump(file, compress)
+
+    @classmethod
+    def load(cls, file, function=None) -> "SnapshotHashMap":
+        """
+        Returns a new map with the table written by dump(), published to readers.
+        """
+        map = super().load(file, function)
+        map._publish()
+        return map
+
+    # ------------------------------------------------------------------ #
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) from the published table without
+        locking, or default (None unless given) if key is not in the hash map.
+        """
+        return self._published.get(key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the published table, False otherwise, without locking.
+        """
+        return self._published.contains_key(key)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in, all
+        read from the same published table without locking.
+        """
+        return self._published.get_many(keys, default)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element of a snapshot.
+        """
+        return self.snapshot().get_keys_and_values()
+
+    def __iter__(self):
+        """
+        Returns an iterator over the active HashEntry objects of a snapshot, so writes
+        during the iteration neither fail nor show up in it.
+        """
+        return iter(self.snapshot())
+
+
+class PowerOfTwoHashMap(HashMap):
+    """
+    HashMap variant whose capacity is a power of two.
+    Buckets are chosen by masking with (capacity - 1) instead of taking a modulo, and
+    collisions are resolved with triangular probing (steps of 1, 2, 3, ...), which visits
+    every bucket of a power-of-two table, so a free bucket is always found.
+    Hashes go through mix_hash() first so the low bits used by the mask depend on the
+    whole hash, since the sample hash functions only vary in their low bits.
+    """
+
+    # triangular probing visits every bucket, so any load below 1.0 leaves an empty one
+    _max_load_limit = 1.0
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Rounds the capacity up to a power of two, used in place of a prime capacity,
+        so growth_factor is rounded up to 2 in effect
+        """
+        return 1 << max(capacity - 1, 1).bit_length()
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the triangular probe sequence for the key once, with the same results
+        as HashMap._find_slot().
+        """
+        mask = self._capacity - 1
+        new_index = mix_hash(key_hash) & mask
+        step = 1
+        tombstone_index = None
+
+        while self._buckets[new_index] is not None:
+            element = self._buckets[new_index]
+            if element.is_tombstone:
+                if tombstone_index is None:
+                    tombstone_index = new_index
+            elif element.hash == key_hash and element.key == key:
+                return new_index, True
+
+            # triangular probing for next available index
+            new_index = (new_index + step) & mask
+            step += 1
+
+        if tombstone_index is not None:
+            return tombstone_index, False
+        return new_index, False
+
+    @staticmethod
+    def _probe_free(table: DynamicArray, capacity: int, key_hash: int) -> int:
+        """
+        Returns the first empty bucket on the triangular probe sequence of the hash in a
+        table being rebuilt.
+        """
+        mask = capacity - 1
+        new_index = mix_hash(key_hash) & mask
+        step = 1
+        while table[new_index] is not None:
+            new_index = (new_index + step) & mask
+            step += 1
+        return new_index
+
+
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 if __name__ == "__main__":
@@ -0,0 +1,466 @@
+# Description: Implementation of a Hash Map with Open Addressing, utilizing a Dynamic Array for the underlying data
+# storage, and resolves collisions with Robin Hood linear probing. An element being inserted takes the index of any
+# element that is closer to its home index (the index its hash maps to) than the inserted one, and that element
+# continues probing instead. This keeps probe lengths short and even, so the table runs at a 0.85 load factor.
+# Removal shifts the following elements of the probe run back by one index, so no Tombstones are ever left behind.
+# Each index in the array stores key/value pairs through the use of the HashEntry class (is_tombstone stays False),
+# with the key's hash passed through mix_hash() as its cached hash.
+# Has the same methods as the hash map in hash_map_oa.py: put() (insert key/value), resize_table(), table_load(),
+# empty_buckets(), get(), contains_key(), remove(), pop(), setdefault(), update_with(), put_many(), get_many(),
+# remove_many(), reserve(), get_keys_and_values(), clear(), __iter__() and __next__().
+
+
+from datastructures import (DynamicArray, DynamicArrayException, HashEntry,
+                            hash_function_1, hash_function_2, hash_keys,
+                            mix_hash, next_prime_capacity)
+
+
+class HashMap:
+
+    # highest load factor allowed after an insertion
+    _max_load = 0.85
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        Robin Hood linear probing for collision resolution
+        """
+        self._buckets = DynamicArray()
+
+        # capacity must be a prime number
+        self._capacity = next_prime_capacity(capacity)
+        for _ in range(self._capacity):
+            self._buckets.append(None)
+
+        self._hash_function = function
+        self._size = 0
+
+    @classmethod
+    def with_expected_size(cls, count: int, function=hash_function_1) -> "HashMap":
+        """
+        Returns a new HashMap with capacity for count elements within the maximum load factor.
+        """
+        return cls(int((count + 1) / cls._max_load) + 1, function)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._buckets.length()):
+            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the hash of the key passed through mix_hash(). Linear probing turns runs of
+        nearby hashes, which the sample hash functions produce, into long clusters, so the
+        map stores and probes with mixed hashes.
+        """
+        return mix_hash(self._hash_function(key))
+
+    def _hash_many(self, keys: list) -> list:
+        """
+        Returns the mixed hashes of a list of keys, hashing them together with hash_keys().
+        """
+        return [mix_hash(key_hash) for key_hash in hash_keys(self._hash_function, keys)]
+
+    def _distance(self, element: HashEntry, index: int) -> int:
+        """
+        Returns how many indices the element at index sits past its home index.
+        """
+        return (index - element.hash % self._capacity) % self._capacity
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, int, bool]:
+        """
+        Runs the linear probe sequence for the key once.
+        Returns (index, distance, True) for the index holding the key, otherwise
+        (index, distance, False) for the index where the probe stopped: an empty index, or
+        the first element closer to its home index than the key would be, which the key
+        would take from it on insertion. Stopping there is safe because Robin Hood ordering
+        means the key cannot be found any further along.
+        """
+        capacity = self._capacity
+        new_index = key_hash % capacity
+        distance = 0
+
+        while True:
+            element = self._buckets[new_index]
+            if element is None:
+                return new_index, distance, False
+            if element.hash == key_hash and element.key == key:
+                return new_index, distance, True
+            if self._distance(element, new_index) < distance:
+                return new_index, distance, False
+
+            # linear probing for next index
+            new_index += 1
+            if new_index == capacity:
+                new_index = 0
+            distance += 1
+
+    def _insert_at(self, index: int, distance: int, key: str, key_hash: int, value: object) -> None:
+        """
+        Inserts a new HashEntry at the index and distance returned by _find_slot(), moving
+        the displaced elements further along their probe runs.
+        """
+        self._size += 1
+        self._place(self._buckets, self._capacity, HashEntry(key, value, key_hash), index, distance)
+
+    def _place(self, table: DynamicArray, capacity: int, element: HashEntry,
+               new_index: int = None, distance: int = 0) -> None:
+        """
+        Places the element into the table, starting at new_index (its home index unless given)
+        and swapping it with any element that is closer to its own home index.
+        """
+        if new_index is None:
+            new_index = element.hash % capacity
+
+        while True:
+            current = table[new_index]
+            if current is None:
+                table[new_index] = element
+                return
+
+            current_distance = (new_index - current.hash % capacity) % capacity
+            if current_distance < distance:
+                # richer element gives up its index and continues probing instead
+                table[new_index] = element
+                element, distance = current, current_distance
+
+            new_index += 1
+            if new_index == capacity:
+                new_index = 0
+            distance += 1
+
+    def _remove_at(self, index: int) -> object:
+        """
+        Removes the element at the index and shifts the following elements of its probe run
+        back by one index, so no Tombstone is needed. Returns the removed value.
+        """
+        value = self._buckets[index].value
+        self._size -= 1
+
+        next_index = index + 1 if index + 1 < self._capacity else 0
+        element = self._buckets[next_index]
+        # stop at an empty index or an element already at its home index
+        while element is not None and self._distance(element, next_index) > 0:
+            self._buckets[index] = element
+            index = next_index
+            next_index = index + 1 if index + 1 < self._capacity else 0
+            element = self._buckets[next_index]
+
+        self._buckets[index] = None
+        return value
+
+    def _make_room(self) -> None:
+        """
+        Doubles the table if one more element would take it past the maximum load factor.
+        """
+        if (self._size + 1) / self._capacity > self._max_load:
+            self.resize_table(2 * self._capacity)
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts a new element into the hash map if the key is not in the hash map.
+        If the key is in the hash map, updates the key with new value.
+        Maintains table load factor of at most 0.85 by resizing the table with resize_table().
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, distance, found = self._find_slot(key, key_hash)
+
+        if found:
+            self._buckets[index].value = value
+        else:
+            self._insert_at(index, distance, key, key_hash, value)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash map to the closest prime number at or above the new capacity,
+        growing it further if needed to stay within the maximum load factor.
+        Moves the existing HashEntry objects into the new table from their cached hash.
+        """
+        if new_capacity < self._size:
+            return
+
+        new_capacity = next_prime_capacity(new_capacity)
+        while self._size / new_capacity > self._max_load:
+            new_capacity = next_prime_capacity(2 * new_capacity)
+
+        new_table = DynamicArray()
+        for index in range(new_capacity):
+            new_table.append(None)
+
+        for index in range(self._buckets.length()):
+            element = self._buckets[index]
+            if element is not None:
+                self._place(new_table, new_capacity, element)
+
+        self._buckets = new_table
+        self._capacity = new_capacity
+
+    def table_load(self) -> float:
+        """
+        Calculates the table load factor, the average number of elements per bucket.
+        Returns a float value containing the table load factor.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that are None.
+        """
+        return self._capacity - self._size
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        index, distance, found = self._find_slot(key, self._hash(key))
+        if found:
+            return self._buckets[index].value
+        return default
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Probes for the key (string) passed in once to determine if it is in the hash map.
+        Returns True if key is in the map, False otherwise.
+        """
+        if self._size == 0:
+            return False
+
+        return self._find_slot(key, self._hash(key))[2]
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key passed in (string) from the hash map, decreases the map's size by 1.
+        The elements following it in its probe run are shifted back one index.
+        """
+        self.pop(key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map with a single probe and returns
+        its value, or default (None unless given) if key is not in the hash map.
+        """
+        index, distance, found = self._find_slot(key, self._hash(key))
+        if not found:
+            return default
+        return self._remove_at(index)
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        Hashes and probes for the key once.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, distance, found = self._find_slot(key, key_hash)
+        if found:
+            return self._buckets[index].value
+
+        self._insert_at(index, distance, key, key_hash, value)
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map.
+        Hashes and probes for the key once, and returns the new value.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, distance, found = self._find_slot(key, key_hash)
+        if found:
+            element = self._buckets[index]
+            element.value = function(element.value)
+            return element.value
+
+        value = function(default)
+        self._insert_at(index, distance, key, key_hash, value)
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in.
+        The keys are hashed together and the table is sized once for the keys that are new.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        key_hashes = self._hash_many(keys)
+        if self._size:
+            # the keys already in the map are updated in place first, so the table is sized
+            # for the new keys only; every pair of a new key is kept, in order, for below
+            new_pairs = []
+            for (key, value), key_hash in zip(pairs, key_hashes):
+                index, distance, found = self._find_slot(key, key_hash)
+                if found:
+                    self._buckets[index].value = value
+                else:
+                    new_pairs.append(((key, value), key_hash))
+            new_keys = {key for (key, value), key_hash in new_pairs}
+        else:
+            # in an empty map every key is new
+            new_pairs = zip(pairs, key_hashes)
+            new_keys = set(keys)
+
+        self.reserve(self._size + len(new_keys))
+        for (key, value), key_hash in new_pairs:
+            index, distance, found = self._find_slot(key, key_hash)
+            if found:
+                self._buckets[index].value = value
+            else:
+                self._insert_at(index, distance, key, key_hash, value)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            index, distance, found = self._find_slot(key, key_hash)
+            values.append(self._buckets[index].value if found else default)
+        return values
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            index, distance, found = self._find_slot(key, key_hash)
+            values.append(self._remove_at(index) if found else default)
+        return values
+
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count elements fit within the maximum load factor.
+        """
+        if (count + 1) / self._capacity > self._max_load:
+            self.resize_table(int((count + 1) / self._max_load) + 1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Retrieves the keys and values of each element in the hash map and
+        returns a dynamic array with a tuple at each index (key, value).
+        Order does not matter.
+        """
+        keys_vals = DynamicArray()
+        for index in range(self._buckets.length()):
+            element = self._buckets[index]
+            if element is not None:
+                keys_vals.append((element.key, element.value))
+        return keys_vals
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, creating buckets with None.
+        Size becomes 0, but underlying capacity remains the same.
+        """
+        self._buckets = DynamicArray()
+        for index in range(self._capacity):
+            self._buckets.append(None)
+        self._size = 0
+
+    def __iter__(self):
+        """
+        Enables iteration (for i in map) and initializes an index variable to track
+        each index in the map.
+        """
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Returns the next element (HashEntry) that is not None.
+        Stops iteration with the exception raised.
+        """
+        try:
+            element = None
+            while element is None:
+                element = self._buckets.get_at_index(self._index)
+                self._index += 1
+
+        except DynamicArrayException:
+            raise StopIteration
+
+        return element
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nresize example")
+    print("--------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nremove example")
+    print("--------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(8):
+        m.put('key' + str(i), i)
+    m.remove('key3')
+    m.remove('key8')
+    print(m.get_size(), m.contains_key('key3'), m.get('key4'), m.empty_buckets())
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
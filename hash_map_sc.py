@@ -1,35 +1,79 @@
 # Name: Rachel Hoeferlin
 # Date: 06/06/24
 # Description: Implementation of a Hash Map utilizing a Dynamic Array for the underlying data storage, and
-# Separate Chaining with Linked Lists to resolve collisions where the index is occupied.
-# Array stores key/value pairs through the use of Linked Lists for each element in the buckets of the Hash Map.
+# Separate Chaining to resolve collisions where the index is occupied.
+# Buckets adapt to the number of key/value pairs (SLNodes) they hold: an empty bucket is None, a single node is
+# stored inline in the array, a few nodes share a small ArrayBucket, and a bucket past ARRAY_BUCKET_LIMIT nodes becomes
+# a SortedBucket ordered by (hash, key), so even keys that all collide are found in O(log n).
 # Includes the following methods: put() (insert key/value), resize_table(), table_load(), empty_buckets(),
 # get(), contains_key(), remove(), get_keys_and_values() (returns Dynamic Array containing tuples of key/value pairs),
-# clear(), and find_mode() (returns tuple: (Dynamic Array of mode(s)'s key, frequency)).
-
-
-from a6_include import (DynamicArray, LinkedList,
-                        hash_function_1, hash_function_2)
+# shrink_to_fit(), get_load_factors(), set_load_factors(), clear(),
+# and find_mode() (returns tuple: (Dynamic Array of mode(s)'s key, frequency)).
+# Also includes the single-probe methods pop(), setdefault() and update_with() (read-modify-write of a value),
+# and the bulk methods put_many(), get_many() and remove_many().
+# dump() writes the buckets with their shapes and cached hashes to a binary file, optionally gzip compressed, and
+# HashMap.load() reads them back without rehashing.
+# IncrementalHashMap is a variant that spreads the work of growing the table over the operations that follow.
+
+
+import pickle
+
+from datastructures import (DUMP_CHUNK, ArrayBucket, DynamicArray, SLNode, SortedBucket,
+                            dump_stream, hash_function_1, hash_function_2, hash_function_id,
+                            hash_keys, load_stream, next_prime_capacity, resolve_hash_function)
+
+# a bucket holding more nodes than this becomes a SortedBucket
+ARRAY_BUCKET_LIMIT = 8
+# a SortedBucket shrinking to this many nodes goes back to an ArrayBucket
+SORTED_BUCKET_MIN = 4
+# defaults for the load factor thresholds and the growth of the table, settable per map:
+# the table grows GROWTH_FACTOR times once the load factor reaches MAX_LOAD_FACTOR, and
+# halves once it drops below MIN_LOAD_FACTOR, down to its initial capacity
+MAX_LOAD_FACTOR = 1.0
+MIN_LOAD_FACTOR = 0.125
+GROWTH_FACTOR = 2.0
+# old buckets IncrementalHashMap moves into the new table per operation while resizing
+REHASH_STEPS = 4
+# shapes of a non-empty bucket in a dump
+_INLINE = 0
+_ARRAY = 1
+_SORTED = 2
 
 
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        with the load factor thresholds and growth factor passed in
         """
+        self._check_load_factors(max_load_factor, min_load_factor, growth_factor)
         self._buckets = DynamicArray()
 
         # capacity must be a prime number
         self._capacity = self._next_prime(capacity)
         for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+            self._buckets.append(None)
 
         self._hash_function = function
         self._size = 0
+        # removals never shrink the table below the capacity it was created with
+        self._min_capacity = self._capacity
+        self._max_load_factor = max_load_factor
+        self._min_load_factor = min_load_factor
+        self._growth_factor = growth_factor
+
+    @classmethod
+    def with_expected_size(cls, count: int, function: callable = hash_function_1) -> "HashMap":
+        """
+        Returns a new HashMap with capacity for count elements within the default max load factor.
+        """
+        return cls(int(count / MAX_LOAD_FACTOR), function)
 
     def __str__(self) -> str:
         """
@@ -43,16 +87,10 @@ class HashMap:
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Find the closest prime number at or above the given number,
+        picked from the precomputed PRIME_CAPACITIES instead of testing candidates
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime_capacity(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
@@ -88,62 +126,205 @@ class HashMap:
         """
         return self._capacity
 
+    def get_load_factors(self) -> tuple[float, float, float]:
+        """
+        Returns the (max_load_factor, min_load_factor, growth_factor) of the map
+        """
+        return self._max_load_factor, self._min_load_factor, self._growth_factor
+
+    def set_load_factors(self, max_load_factor: float = None, min_load_factor: float = None,
+                         growth_factor: float = None) -> None:
+        """
+        Changes the load factor thresholds and growth factor passed in (None keeps the
+        current one), then resizes the table right away if the current load is outside
+        the new thresholds. Raises ValueError, changing nothing, for invalid settings.
+        """
+        max_load_factor = self._max_load_factor if max_load_factor is None else max_load_factor
+        min_load_factor = self._min_load_factor if min_load_factor is None else min_load_factor
+        growth_factor = self._growth_factor if growth_factor is None else growth_factor
+        self._check_load_factors(max_load_factor, min_load_factor, growth_factor)
+
+        self._max_load_factor = max_load_factor
+        self._min_load_factor = min_load_factor
+        self._growth_factor = growth_factor
+
+        if self._size > self._max_load_factor * self._capacity:
+            self.resize_table(int(self._size / self._max_load_factor) + 1)
+        else:
+            self._release_room()
+
+    @staticmethod
+    def _check_load_factors(max_load_factor: float, min_load_factor: float,
+                            growth_factor: float) -> None:
+        """
+        Raises ValueError unless max_load_factor > 0 (chains let it go past 1.0),
+        growth_factor > 1, and min_load_factor is low enough that neither halving nor
+        growing the table lands on the other threshold.
+        """
+        if not max_load_factor > 0:
+            raise ValueError(f"max_load_factor must be above 0, got {max_load_factor}")
+        if not growth_factor > 1:
+            raise ValueError(f"growth_factor must be above 1, got {growth_factor}")
+        if not 0 <= min_load_factor * max(2, growth_factor) < max_load_factor:
+            raise ValueError(f"min_load_factor must be at least 0 and below max_load_factor / "
+                             f"max(2, growth_factor), got {min_load_factor}")
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _nodes(bucket) -> tuple:
+        """
+        Returns an iterable over the SLNodes of a bucket of any shape.
+        """
+        if bucket is None:
+            return ()
+        if type(bucket) is SLNode:
+            return bucket,
+        return bucket
+
+    @staticmethod
+    def _search_bucket(bucket, key: str, key_hash: int) -> SLNode:
+        """
+        Returns the SLNode with the key in a bucket of any shape, or None if it is not there.
+        """
+        if bucket is None:
+            return None
+        if type(bucket) is SLNode:
+            if bucket.hash == key_hash and bucket.key == key:
+                return bucket
+            return None
+        return bucket.contains(key, key_hash)
+
+    def _find_node(self, key: str, key_hash: int) -> SLNode:
+        """
+        Returns the SLNode with the key from the bucket it hashes to, or None if it is not there.
+        """
+        return self._search_bucket(self._buckets[key_hash % self._capacity], key, key_hash)
+
+    def _add_node(self, index: int, node: SLNode) -> None:
+        """
+        Adds an SLNode whose key is not in the map to the bucket at index, moving the
+        bucket to the next shape when it outgrows its current one.
+        """
+        bucket = self._buckets[index]
+        if bucket is None:
+            self._buckets[index] = node
+        elif type(bucket) is SLNode:
+            self._buckets[index] = ArrayBucket(bucket, node)
+        else:
+            bucket.insert(node)
+            if type(bucket) is ArrayBucket and bucket.length() > ARRAY_BUCKET_LIMIT:
+                self._buckets[index] = SortedBucket(bucket)
+
+    def _pop_node(self, key: str, key_hash: int) -> SLNode:
+        """
+        Removes and returns the SLNode with the key from the bucket it hashes to, or None if
+        it is not there.
+        """
+        return self._remove_from(self._buckets, key_hash % self._capacity, key, key_hash)
+
+    @staticmethod
+    def _remove_from(table: DynamicArray, index: int, key: str, key_hash: int) -> SLNode:
+        """
+        Removes and returns the SLNode with the key from the bucket at index of the table,
+        or None if it is not there, moving the bucket back to a smaller shape when it shrinks.
+        """
+        bucket = table[index]
+        if bucket is None:
+            return None
+        if type(bucket) is SLNode:
+            if bucket.hash == key_hash and bucket.key == key:
+                table[index] = None
+                return bucket
+            return None
+
+        node = bucket.pop(key, key_hash)
+        if node is not None:
+            if bucket.length() == 1:
+                table[index] = next(iter(bucket))
+            elif type(bucket) is SortedBucket and bucket.length() <= SORTED_BUCKET_MIN:
+                table[index] = ArrayBucket(*bucket)
+        return node
+
+    def _make_room(self) -> None:
+        """
+        Grows the table ahead of a possible insertion once the load factor reaches max_load_factor.
+        """
+        if self._size >= self._max_load_factor * self._capacity:
+            self.resize_table(self._grown_capacity())
+
+    def _grown_capacity(self) -> int:
+        """
+        Returns growth_factor times the capacity, and at least one more than the capacity.
+        """
+        return max(int(self._capacity * self._growth_factor), self._capacity + 1)
+
+    def _release_room(self) -> None:
+        """
+        Halves the table, as many times as needed, while the load factor is below
+        min_load_factor and the capacity is above the initial one. The halving stops with the
+        load between min_load_factor and twice it (a little lower once the capacity is rounded
+        up to a prime), or lower still when it stops at the initial capacity. Either way the
+        load stays below max_load_factor, which the settings keep above twice min_load_factor,
+        so a map hovering around a threshold does not resize back and forth.
+        """
+        new_capacity = self._capacity
+        while new_capacity > self._min_capacity and self._size < self._min_load_factor * new_capacity:
+            new_capacity //= 2
+
+        if new_capacity < self._capacity:
+            self.resize_table(max(new_capacity, self._min_capacity))
+
     # ------------------------------------------------------------------ #
 
     def put(self, key: str, value: object) -> None:
         """
         Inserts a new element (key, value) into the hash map if the key is not in the hash map.
         If the key is in the hash map, updates the key with new value.
-        Maintains table load factor of less than 1.0 by resizing the table using resize_table().
+        Maintains table load factor of less than max_load_factor by resizing the table using resize_table().
         Increases the underlying size of the hash map by 1 when inserting a new element.
         """
-        if self.table_load() >= 1.0:
-            self.resize_table(2 * self._capacity)
-        # compute bucket
-        table_index = self._hash_function(key) % self._capacity
-        # search at that bucket for key
-        node = self._buckets.get_at_index(table_index)
+        key_hash = self._hash_function(key)
+        self._make_room()
+        # search at the key's bucket for key
+        element = self._find_node(key, key_hash)
 
         # key already in hash map update its value
-        if node.contains(key):
-            element = node.contains(key)
+        if element:
             element.value = value
 
         # key not in hash map, add new key/value node
         else:
-            node.insert(key, value)
+            self._add_node(key_hash % self._capacity, SLNode(key, value, None, key_hash))
             self._size += 1
 
     def resize_table(self, new_capacity: int) -> None:
         """
         Resizes the hash map with the new capacity (integer) variable passed in,
-        which is double the old capacity.
-        Checks that the new capacity is a prime number, else utilizes the
-        is_prime() and next_prime() methods to calculate and set that as the new capacity.
-        Creates a new hash table and uses indirect recursion to insert active elements and
-        their key/value by utilizing the put() method.
+        which is growth_factor times the old capacity when growing and half of it when shrinking.
+        Rounds the new capacity up to the closest prime number with next_prime(), growing
+        it further while the elements would not fit within max_load_factor.
+        Creates a new hash table and moves every SLNode into it from its cached hash,
+        so no key is hashed again and no node is copied.
         """
         if new_capacity < 1:
             return
 
-        if new_capacity >= 1:
-            if not self._is_prime(new_capacity):
-                new_capacity = self._next_prime(new_capacity)
+        new_capacity = self._next_prime(new_capacity)
+        while self._size > self._max_load_factor * new_capacity:
+            new_capacity = self._next_prime(max(int(new_capacity * self._growth_factor), new_capacity + 1))
 
-        self._capacity = new_capacity
         old_table = self._buckets
+        self._capacity = new_capacity
         self._buckets = DynamicArray()
-        self._size = 0
 
         # create new, empty hash map
         for index in range(self._capacity):
-            self._buckets.append(LinkedList())
+            self._buckets.append(None)
 
-        # use logic of put() to insert elements into new hash map
         for index in range(old_table.length()):
-            node = old_table.get_at_index(index)
-            for element in node:
-                self.put(element.key, element.value)
+            for node in self._nodes(old_table[index]):
+                self._add_node(node.hash % self._capacity, node)
 
     def table_load(self) -> float:
         """
@@ -154,70 +335,179 @@ class HashMap:
         table_load = self._size / self._capacity
         return table_load
 
+    def shrink_to_fit(self) -> None:
+        """
+        Rebuilds the hash map at the smallest capacity that holds its elements within
+        max_load_factor, regardless of the initial capacity.
+        """
+        self.resize_table(max(int(self._size / self._max_load_factor), 1))
+
     def empty_buckets(self) -> int:
         """
         Returns the number (integer) of buckets that have no nodes/elements.
         """
         empty_buckets = 0
         for index in range(self._buckets.length()):
-            # no chains = empty bucket
-            if self._buckets.get_at_index(index).length() == 0:
+            # empty buckets are None
+            if self._buckets[index] is None:
                 empty_buckets += 1
 
         return empty_buckets
 
-    def get(self, key: str):
+    def get(self, key: str, default: object = None):
         """
         Retrieves and returns the value (object) that corresponds with the key (string) passed in.
-        Returns None if key is not in the hash map.
+        Returns default (None unless given) if key is not in the hash map.
         """
-        table_index = self._hash_function(key) % self._capacity
-        search_node = self._buckets.get_at_index(table_index)
-
-        # contains() returns SLNode to retrieve its value
-        if search_node.contains(key):
-            return search_node.contains(key).value
+        key_hash = self._hash_function(key)
+        element = self._find_node(key, key_hash)
+        if element:
+            return element.value
         else:
-            return None
+            return default
 
     def contains_key(self, key: str) -> bool:
         """
-        Utilizes the contains(key) method in the LinkedList class to determine if the key (string)
-        passed in is in the hash map.
+        Searches the bucket the key (string) hashes to once to determine if it is in the hash map.
         Returns True if key is in the map, False otherwise.
         """
         if self._size == 0:
             return False
 
-        table_index = self._hash_function(key) % self._capacity
-        search_node = self._buckets.get_at_index(table_index)
+        key_hash = self._hash_function(key)
+        return self._find_node(key, key_hash) is not None
 
-        if search_node.contains(key):
-            return True
-        else:
-            return False
-
-    def remove(self, key: str) -> None:
+    def remove(self, key: str) -> object:
         """
         Removes the key passed in (string) from the hash map, decreases the hash map's size by 1.
-        Utilizes the remove(key) method in the LinkedList class to remove the node.
+        Only the bucket the key hashes to is searched.
+        Returns the removed value, or None if key is not in the hash map.
         """
-        table_index = self._hash_function(key) % self._capacity
-        bucket = self._buckets.get_at_index(table_index)
+        return self.pop(key)
 
-        if not bucket.contains(key):
-            return
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map with a single search of its bucket
+        and returns its value, or default (None unless given) if key is not in the hash map.
+        Shrinks the table once the load factor drops below min_load_factor.
+        """
+        key_hash = self._hash_function(key)
+        element = self._pop_node(key, key_hash)
+        if not element:
+            return default
 
-        if bucket.contains(key):
-            self._size -= 1
+        self._size -= 1
+        self._release_room()
+        return element.value
 
-        for index in range(self._buckets.length()):
-            if self._buckets.get_at_index(index):
-                node = self._buckets.get_at_index(index)
-                node.remove(key)
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        Hashes the key and searches its bucket once.
+        """
+        key_hash = self._hash_function(key)
+        self._make_room()
+
+        element = self._find_node(key, key_hash)
+        if element:
+            return element.value
+
+        self._add_node(key_hash % self._capacity, SLNode(key, value, None, key_hash))
+        self._size += 1
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map, e.g. update_with(key, lambda n: n + 1, 0)
+        to count. Hashes the key and searches its bucket once, and returns the new value.
+        """
+        key_hash = self._hash_function(key)
+        self._make_room()
+
+        element = self._find_node(key, key_hash)
+        if element:
+            element.value = function(element.value)
+            return element.value
 
-        if self._size < 0:
-            self._size = 0
+        value = function(default)
+        self._add_node(key_hash % self._capacity, SLNode(key, value, None, key_hash))
+        self._size += 1
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in.
+        The keys are hashed together and the table is sized once for the keys that are new,
+        so no load checks or intermediate resizes happen per pair.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        key_hashes = hash_keys(self._hash_function, keys)
+        if self._size:
+            # the keys already in the map are updated in place first, so the table is sized
+            # for the new keys only; every pair of a new key is kept, in order, for below
+            new_pairs = []
+            for (key, value), key_hash in zip(pairs, key_hashes):
+                element = self._find_node(key, key_hash)
+                if element:
+                    element.value = value
+                else:
+                    new_pairs.append(((key, value), key_hash))
+            new_keys = {key for (key, value), key_hash in new_pairs}
+        else:
+            # in an empty map every key is new
+            new_pairs = zip(pairs, key_hashes)
+            new_keys = set(keys)
+
+        self.reserve(self._size + len(new_keys))
+        for (key, value), key_hash in new_pairs:
+            element = self._find_node(key, key_hash)
+            if element:
+                element.value = value
+            else:
+                self._add_node(key_hash % self._capacity, SLNode(key, value, None, key_hash))
+                self._size += 1
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            element = self._find_node(key, key_hash)
+            values.append(element.value if element else default)
+        return values
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, hash_keys(self._hash_function, keys)):
+            element = self._pop_node(key, key_hash)
+            if element:
+                self._size -= 1
+                values.append(element.value)
+            else:
+                values.append(default)
+
+        self._release_room()
+        return values
+
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count elements fit within max_load_factor.
+        Call before inserting a known number of elements to avoid repeated growth.
+        """
+        if count > self._max_load_factor * self._capacity:
+            self.resize_table(int(count / self._max_load_factor))
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -227,42 +517,305 @@ class HashMap:
         """
         keys_vals = DynamicArray()
         for index in range(self._buckets.length()):
-            # if there are chains/is not None
-            if self._buckets.get_at_index(index).length():
-                # buckets at indices hold linked list nodes
-                for node in self._buckets.get_at_index(index):
-                    keys_vals.append((node.key, node.value))
+            # buckets at indices hold SLNodes, inline or in a bucket object
+            for node in self._nodes(self._buckets[index]):
+                keys_vals.append((node.key, node.value))
 
         return keys_vals
 
     def clear(self) -> None:
         """
-        Deletes all elements from the hash map, creating empty LinkedList() buckets at each index.
-        Size becomes 0, but underlying capacity remains the same.
+        Deletes all elements from the hash map, setting every bucket to None.
+        Size becomes 0, and capacity returns to the capacity the map was created with.
         """
-        for index in range(self._buckets.length()):
-            self._buckets.set_at_index(index, LinkedList())
+        self._capacity = self._min_capacity
+        self._buckets = DynamicArray()
+        for index in range(self._capacity):
+            self._buckets.append(None)
         self._size = 0
 
+    def _dump_settings(self) -> dict:
+        """
+        Returns the settings of a subclass, beyond those every HashMap has, that dump()
+        records so that load() can create the map with them again.
+        """
+        return {}
+
+    @classmethod
+    def _load_settings(cls, settings: dict) -> dict:
+        """
+        Returns the keyword arguments of the constructor for the settings a dump recorded
+        with _dump_settings(), leaving out any this class does not take.
+        """
+        return {}
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object as it is laid out: each non-empty bucket
+        with its index and shape, and its nodes with their cached hashes, so load() rebuilds
+        every bucket in place without hashing a key. Buckets are pickled DUMP_CHUNK at a time,
+        gzip compressed if compress. Keys and values must be picklable.
+        """
+        settings = {
+            'capacity': self._capacity,
+            'size': self._size,
+            'min_capacity': self._min_capacity,
+            'load_factors': self.get_load_factors(),
+            'function': hash_function_id(self._hash_function),
+            'extra': self._dump_settings(),
+        }
+        with dump_stream(file, 'sc', compress) as stream:
+            pickle.dump(settings, stream, pickle.HIGHEST_PROTOCOL)
+            for start in range(0, self._capacity, DUMP_CHUNK):
+                indices, counts, hashes, keys, values = [], [], [], [], []
+                shapes = bytearray()
+                for index in range(start, min(start + DUMP_CHUNK, self._capacity)):
+                    bucket = self._buckets[index]
+                    if bucket is None:
+                        continue
+                    indices.append(index)
+                    if type(bucket) is SLNode:
+                        shapes.append(_INLINE)
+                    else:
+                        shapes.append(_SORTED if type(bucket) is SortedBucket else _ARRAY)
+                    count = 0
+                    for node in self._nodes(bucket):
+                        hashes.append(node.hash)
+                        keys.append(node.key)
+                        values.append(node.value)
+                        count += 1
+                    counts.append(count)
+                chunk = (indices, bytes(shapes), counts, hashes, keys, values)
+                pickle.dump(chunk, stream, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(None, stream, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file, function=None) -> "HashMap":
+        """
+        Returns a new map with the table written by dump(), read from a binary file object
+        one chunk at a time. The hash function is the one recorded in the dump, and only
+        has to be passed in if it is not one of the sample hash functions.
+        Raises ValueError if the file does not hold a dump of a separate chaining table.
+        The dump is read with pickle, which can run arbitrary code, so only load dumps from
+        a trusted source.
+        """
+        with load_stream(file, 'sc') as stream:
+            settings = pickle.load(stream)
+            max_load_factor, min_load_factor, growth_factor = settings['load_factors']
+            map = cls(settings['capacity'], resolve_hash_function(settings['function'], function),
+                      max_load_factor=max_load_factor, min_load_factor=min_load_factor,
+                      growth_factor=growth_factor, **cls._load_settings(settings.get('extra', {})))
+
+            chunk = pickle.load(stream)
+            while chunk is not None:
+                indices, shapes, counts, hashes, keys, values = chunk
+                position = 0
+                for index, shape, count in zip(indices, shapes, counts):
+                    nodes = [SLNode(keys[node], values[node], None, hashes[node])
+                             for node in range(position, position + count)]
+                    position += count
+                    if shape == _INLINE:
+                        map._buckets[index] = nodes[0]
+                    elif shape == _ARRAY:
+                        map._buckets[index] = ArrayBucket(*nodes)
+                    else:
+                        # written in (hash, key) order, so sorting it again is a single pass
+                        map._buckets[index] = SortedBucket(nodes)
+                chunk = pickle.load(stream)
+
+        map._size = settings['size']
+        map._min_capacity = settings['min_capacity']
+        return map
+
+
+class IncrementalHashMap(HashMap):
+    """
+    HashMap variant that grows its table incrementally, like Redis dictionaries.
+    When put() crosses the load factor, a new table is allocated but the elements stay in
+    the old one; every following operation moves up to rehash_steps non-empty old buckets
+    into the new table, and lookups and removals search both tables until the old one is
+    empty. No single operation pays for rehashing the whole map.
+    Explicit calls to resize_table() and reserve(), and whole-map operations such as
+    get_keys_and_values(), finish any resize in progress first.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 rehash_steps: int = REHASH_STEPS,
+                 max_load_factor: float = MAX_LOAD_FACTOR,
+                 min_load_factor: float = MIN_LOAD_FACTOR,
+                 growth_factor: float = GROWTH_FACTOR) -> None:
+        """
+        Initialize new HashMap that uses separate chaining for collision resolution
+        and moves rehash_steps buckets per operation while resizing
+        """
+        super().__init__(capacity, function, max_load_factor, min_load_factor, growth_factor)
+        self._rehash_steps = rehash_steps
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output, finishing any resize first
+        """
+        self._finish_rehash()
+        return super().__str__()
+
+    # ------------------------------------------------------------------ #
+
+    def _make_room(self) -> None:
+        """
+        Starts moving to a table growth_factor times the capacity once the load factor
+        reaches max_load_factor. A resize still in progress is finished first.
+        """
+        if self._size >= self._max_load_factor * self._capacity:
+            self._finish_rehash()
+            self._start_rehash(self._grown_capacity())
+
+    def _start_rehash(self, new_capacity: int) -> None:
+        """
+        Allocates the new table and keeps the current one as the old table, to be moved over
+        by _rehash_step().
+        """
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._rehash_index = 0
+
+        self._capacity = self._next_prime(new_capacity)
+        self._buckets = DynamicArray()
+        for index in range(self._capacity):
+            self._buckets.append(None)
+
+    def _rehash_step(self, steps: int = None) -> None:
+        """
+        Moves up to steps (rehash_steps unless given) non-empty old buckets into the new table,
+        visiting at most ten times as many buckets so a run of empty ones stays cheap.
+        """
+        if self._old_buckets is None:
+            return
+
+        moves = self._rehash_steps if steps is None else steps
+        visits = 10 * moves
+        old_table = self._old_buckets
+        while moves and visits and self._rehash_index < self._old_capacity:
+            bucket = old_table[self._rehash_index]
+            if bucket is not None:
+                for node in self._nodes(bucket):
+                    self._add_node(node.hash % self._capacity, node)
+                old_table[self._rehash_index] = None
+                moves -= 1
+            self._rehash_index += 1
+            visits -= 1
+
+        if self._rehash_index == self._old_capacity:
+            self._old_buckets = None
+
+    def _finish_rehash(self) -> None:
+        """
+        Moves every remaining old bucket into the new table.
+        """
+        if self._old_buckets is not None:
+            self._rehash_step(self._old_capacity)
+
+    def _find_node(self, key: str, key_hash: int) -> SLNode:
+        """
+        Returns the SLNode with the key, searching the old table too while resizing.
+        """
+        self._rehash_step()
+        node = super()._find_node(key, key_hash)
+        if node is None and self._old_buckets is not None:
+            index = key_hash % self._old_capacity
+            # buckets before the rehash index have already been moved
+            if index >= self._rehash_index:
+                node = self._search_bucket(self._old_buckets[index], key, key_hash)
+        return node
+
+    def _pop_node(self, key: str, key_hash: int) -> SLNode:
+        """
+        Removes and returns the SLNode with the key, searching the old table too while resizing.
+        """
+        self._rehash_step()
+        node = super()._pop_node(key, key_hash)
+        if node is None and self._old_buckets is not None:
+            index = key_hash % self._old_capacity
+            if index >= self._rehash_index:
+                node = self._remove_from(self._old_buckets, index, key, key_hash)
+        return node
+
+    # ------------------------------------------------------------------ #
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Finishes any resize in progress, then resizes the hash map right away.
+        """
+        self._finish_rehash()
+        super().resize_table(new_capacity)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that have no nodes/elements, finishing any resize first.
+        """
+        self._finish_rehash()
+        return super().empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element, finishing any resize first.
+        """
+        self._finish_rehash()
+        return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, dropping the old table of a resize in progress.
+        """
+        self._old_buckets = None
+        super().clear()
+
+    def _dump_settings(self) -> dict:
+        """
+        Records rehash_steps in a dump.
+        """
+        return {**super()._dump_settings(), 'rehash_steps': self._rehash_steps}
+
+    @classmethod
+    def _load_settings(cls, settings: dict) -> dict:
+        """
+        Passes the rehash_steps recorded in a dump to the constructor.
+        """
+        arguments = super()._load_settings(settings)
+        if 'rehash_steps' in settings:
+            arguments['rehash_steps'] = settings['rehash_steps']
+        return arguments
+
+    def dump(self, file, compress: bool = False) -> None:
+        """
+        Writes the table to a binary file object, finishing any resize first.
+        """
+        self._finish_rehash()
+        super().dump(file, compress)
+
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
     Calculates and returns a tuple with a Dynamic Array of the mode(s) (most occurring element/key)
     from the Dynamic Array passed in, with its frequency (count).
-    Initializes an empty HashMap to put() the values from the DynamicArray passed in,
-    counting 1 for each and adding 1 when there is a duplicate.
+    Initializes an empty HashMap to count the values from the DynamicArray passed in with
+    update_with(), starting at 0 for each and adding 1 for every occurrence (one hash and
+    one bucket scan per element).
     """
     map = HashMap()
     frequency = 0
     mode_array = DynamicArray()
 
+    def increment(count: int) -> int:
+        return count + 1
+
     for index in range(da.length()):
-        if not map.contains_key(da[index]):
-            # if element (da[index]) not in map, frequency is 1
-            map.put(da[index], 1)
-        else:
-            # element is duplicate, increase frequency by 1
-            map.put(da[index], map.get(da[index]) + 1)
+        # frequency is 1 for a new element (da[index]), duplicates increase it by 1
+        map.update_with(da[index], increment, 0)
 
     element_array = map.get_keys_and_values()
     # update frequency to be the highest value
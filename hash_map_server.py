@@ -0,0 +1,421 @@
+# Description: asyncio key-value server around a separate chaining HashMap (hash_map_sc.py), so several processes can
+# share one table over a TCP or Unix socket, and the matching asyncio client with a pool of pipelined connections.
+# The protocol is binary: every request and response is a frame of an opcode (or status), the body length and the
+# body. Keys are length-prefixed UTF-8; values are sent as a type, a length and the bytes of encode_value() (bytes,
+# UTF-8 text or a pickle), and the server stores and returns them in that form without decoding them, rejecting
+# values of any other type. The requests are GET, PUT, DEL, MGET and MSET.
+# Any peer can store a pickle that other clients would then unpickle, so clients only send and load pickled values
+# when connected with allow_pickle=True, which should only be done when every peer of the server is trusted.
+# Requests may be pipelined: the server reads whatever has arrived on a connection, runs every complete request in it
+# against the map in one event loop tick, with no other connection's requests in between, and writes all the
+# responses back at once, in request order.
+# HashMapClient has get(), put(), remove(), get_many(), put_many() and close(), all coroutines; its requests are
+# spread over the pool round robin, each connection keeping many requests in flight. Without allow_pickle, values
+# are bytes or strings only.
+
+
+import asyncio
+import struct
+from collections import deque
+
+from datastructures import (VALUE_BYTES, VALUE_PICKLED, VALUE_STR, DynamicArray, decode_value, encode_value,
+                            hash_function_2)
+from hash_map_sc import HashMap
+
+# request opcodes
+GET = 1
+PUT = 2
+DEL = 3
+MGET = 4
+MSET = 5
+# response statuses
+OK = 0
+ERROR = 1
+# bytes read from a connection at a time
+READ_SIZE = 1 << 16
+# largest frame body accepted, a longer one closes the connection
+MAX_FRAME = 1 << 26
+# connections a client opens by default
+POOL_SIZE = 4
+
+# frame: opcode or status, body length
+_FRAME = struct.Struct('<BI')
+# key length, and the count of keys or pairs of MGET and MSET
+_LENGTH = struct.Struct('<I')
+# value field: type, length, followed by the bytes of the value
+_VALUE = struct.Struct('<BI')
+# types of the value field the server accepts, and the type of the field of a key that is not in the map
+_VALUE_TYPES = (VALUE_BYTES, VALUE_STR, VALUE_PICKLED)
+_ABSENT = 255
+
+
+class HashMapServerError(Exception):
+    """
+    Raised by the client for a request the server answered with an error.
+    """
+    pass
+
+
+def _pack_key(key: str) -> bytes:
+    """
+    Returns the length-prefixed UTF-8 bytes of a key.
+    """
+    key_bytes = key.encode()
+    return _LENGTH.pack(len(key_bytes)) + key_bytes
+
+
+def _pack_value(value: object, allow_pickle: bool) -> bytes:
+    """
+    Returns the value field of a value. Raises TypeError for a value that is neither
+    bytes nor a string unless allow_pickle.
+    """
+    value_type, value_bytes = encode_value(value)
+    if value_type == VALUE_PICKLED and not allow_pickle:
+        raise TypeError(f"{type(value).__name__} values are pickled, which needs allow_pickle=True")
+    return _VALUE.pack(value_type, len(value_bytes)) + value_bytes
+
+
+def _unpack_key(body: bytes, offset: int) -> tuple[str, int]:
+    """
+    Returns the key at offset of a body and the offset after it.
+    """
+    length = _LENGTH.unpack_from(body, offset)[0]
+    start = offset + _LENGTH.size
+    if start + length > len(body):
+        raise ValueError("key runs past the end of the frame")
+    return body[start:start + length].decode(), start + length
+
+
+def _unpack_value(body: bytes, offset: int, absent: bool = False) -> tuple[bytes, int]:
+    """
+    Returns the value field at offset of a body, undecoded, and the offset after it.
+    Raises ValueError for a field of an unknown type; the field of a key that is not in
+    the map is only accepted if absent.
+    """
+    value_type, length = _VALUE.unpack_from(body, offset)
+    if value_type not in _VALUE_TYPES and not (absent and value_type == _ABSENT):
+        raise ValueError(f"unknown value type {value_type}")
+    end = offset + _VALUE.size + length
+    if end > len(body):
+        raise ValueError("value runs past the end of the frame")
+    return body[offset:end], end
+
+
+def _decode_field(field: bytes, default: object, allow_pickle: bool) -> object:
+    """
+    Returns the value of a value field, or default for the field of a key not in the map.
+    Raises ValueError for a pickled value unless allow_pickle.
+    """
+    value_type = field[0]
+    if value_type == _ABSENT:
+        return default
+    if value_type == VALUE_PICKLED and not allow_pickle:
+        raise ValueError("the value is pickled, loading it needs allow_pickle=True")
+    return decode_value(value_type, field[_VALUE.size:])
+
+
+class HashMapServer:
+    """
+    Serves a HashMap to HashMapClients. The map holds the value fields received, not
+    decoded values, and is only touched from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, map: HashMap = None) -> None:
+        """
+        Initialize a server for the map passed in, or a new empty HashMap
+        """
+        self._map = HashMap() if map is None else map
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        """
+        Starts serving on a TCP socket (on a free port unless given) and returns the asyncio server.
+        """
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """
+        Starts serving on a Unix socket at path and returns the asyncio server.
+        """
+        return await asyncio.start_unix_server(self._serve_connection, path)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of one connection until it closes. Every complete request read
+        in one go is run before the next await, and their responses are written together.
+        """
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                buffer += data
+
+                responses = []
+                offset = 0
+                while len(buffer) - offset >= _FRAME.size:
+                    opcode, length = _FRAME.unpack_from(buffer, offset)
+                    if length > MAX_FRAME:
+                        return
+                    end = offset + _FRAME.size + length
+                    if end > len(buffer):
+                        break
+                    responses.append(self._execute(opcode, bytes(buffer[offset + _FRAME.size:end])))
+                    offset = end
+                del buffer[:offset]
+
+                if responses:
+                    writer.write(b''.join(responses))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _execute(self, opcode: int, body: bytes) -> bytes:
+        """
+        Runs one request against the map and returns its response frame.
+        A malformed request gets an ERROR response with the reason.
+        """
+        try:
+            response = self._respond(opcode, body)
+        except struct.error:
+            message = b"request body too short"
+            return _FRAME.pack(ERROR, len(message)) + message
+        except ValueError as error:
+            message = str(error).encode()
+            return _FRAME.pack(ERROR, len(message)) + message
+        return _FRAME.pack(OK, len(response)) + response
+
+    def _respond(self, opcode: int, body: bytes) -> bytes:
+        """
+        Returns the response body of a request.
+        """
+        absent = _VALUE.pack(_ABSENT, 0)
+        if opcode == GET:
+            key, offset = _unpack_key(body, 0)
+            return self._map.get(key, absent)
+
+        if opcode == PUT:
+            key, offset = _unpack_key(body, 0)
+            field, offset = _unpack_value(body, offset)
+            self._map.put(key, field)
+            return b''
+
+        if opcode == DEL:
+            key, offset = _unpack_key(body, 0)
+            return b'\x01' if self._map.pop(key, None) is not None else b'\x00'
+
+        if opcode == MGET:
+            count = _LENGTH.unpack_from(body, 0)[0]
+            offset = _LENGTH.size
+            keys = []
+            for _ in range(count):
+                key, offset = _unpack_key(body, offset)
+                keys.append(key)
+            fields = self._map.get_many(keys, absent)
+            return b''.join(fields[index] for index in range(fields.length()))
+
+        if opcode == MSET:
+            count = _LENGTH.unpack_from(body, 0)[0]
+            offset = _LENGTH.size
+            pairs = []
+            for _ in range(count):
+                key, offset = _unpack_key(body, offset)
+                field, offset = _unpack_value(body, offset)
+                pairs.append((key, field))
+            self._map.put_many(pairs)
+            return b''
+
+        raise ValueError(f"unknown opcode {opcode}")
+
+
+class _Connection:
+    """
+    One pooled client connection: its streams, a future per request in flight, in order,
+    and once the connection has closed, the reason.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.pending = deque()
+        self.error = None
+        self.task = asyncio.ensure_future(self._read_responses())
+
+    async def _read_responses(self) -> None:
+        """
+        Resolves the futures of the requests in flight with their (status, body), in order,
+        failing all of them and recording the reason if the connection closes.
+        """
+        try:
+            while True:
+                header = await self.reader.readexactly(_FRAME.size)
+                status, length = _FRAME.unpack(header)
+                body = await self.reader.readexactly(length)
+                future = self.pending.popleft()
+                if not future.done():
+                    future.set_result((status, body))
+        except (asyncio.IncompleteReadError, ConnectionError) as error:
+            self.error = f"connection to the server closed: {error}"
+            while self.pending:
+                future = self.pending.popleft()
+                if not future.done():
+                    future.set_exception(ConnectionError(self.error))
+
+
+class HashMapClient:
+    """
+    Client of a HashMapServer with a pool of connections, each pipelining the requests
+    sent through it. Values may be bytes or strings, or with allow_pickle any picklable
+    object; a client with allow_pickle runs whatever code a pickle stored by any peer of
+    the server asks for. Create with HashMapClient.connect().
+    """
+
+    def __init__(self, connections: list, allow_pickle: bool = False) -> None:
+        """
+        Initialize a client over connected _Connections
+        """
+        self._connections = connections
+        self._allow_pickle = allow_pickle
+        self._next = 0
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = None, path: str = None,
+                      pool_size: int = POOL_SIZE, allow_pickle: bool = False) -> "HashMapClient":
+        """
+        Returns a client with pool_size connections to the server at host and port, or at
+        the Unix socket path if given. Only pass allow_pickle=True if every peer of the
+        server is trusted.
+        """
+        connections = []
+        for _ in range(pool_size):
+            if path is not None:
+                reader, writer = await asyncio.open_unix_connection(path)
+            else:
+                reader, writer = await asyncio.open_connection(host, port)
+            connections.append(_Connection(reader, writer))
+        return cls(connections, allow_pickle)
+
+    async def close(self) -> None:
+        """
+        Closes every connection of the pool.
+        """
+        for connection in self._connections:
+            connection.writer.close()
+        for connection in self._connections:
+            await connection.task
+        self._connections = []
+
+    async def __aenter__(self) -> "HashMapClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _request(self, opcode: int, body: bytes) -> bytes:
+        """
+        Sends a request on the next connection of the pool and returns the response body.
+        Raises HashMapServerError if the server answered with an error, and ConnectionError
+        if the connection has closed.
+        """
+        connection = self._connections[self._next]
+        self._next = (self._next + 1) % len(self._connections)
+        # nothing would ever answer a request queued on a closed connection
+        if connection.error is not None:
+            raise ConnectionError(connection.error)
+
+        future = asyncio.get_running_loop().create_future()
+        # queued and written with no await in between, so futures and responses stay in order
+        connection.pending.append(future)
+        connection.writer.write(_FRAME.pack(opcode, len(body)) + body)
+        try:
+            await connection.writer.drain()
+        except BaseException:
+            # nobody awaits the future now, cancelled so the reader skips it
+            future.cancel()
+            raise
+
+        status, response = await future
+        if status != OK:
+            raise HashMapServerError(response.decode())
+        return response
+
+    # ------------------------------------------------------------------ #
+
+    async def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), or default (None unless given)
+        if key is not in the hash map. Raises ValueError for a pickled value unless the
+        client allows pickles.
+        """
+        response = await self._request(GET, _pack_key(key))
+        # checks the type and length of the field before decoding it
+        _unpack_value(response, 0, absent=True)
+        return _decode_field(response, default, self._allow_pickle)
+
+    async def put(self, key: str, value: object) -> None:
+        """
+        Inserts or updates the key (string) with the value passed in. Raises TypeError for
+        a value that is neither bytes nor a string unless the client allows pickles.
+        """
+        await self._request(PUT, _pack_key(key) + _pack_value(value, self._allow_pickle))
+
+    async def remove(self, key: str) -> bool:
+        """
+        Removes the key passed in (string) from the hash map. Returns True if it was there.
+        """
+        return await self._request(DEL, _pack_key(key)) == b'\x01'
+
+    async def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in, in the
+        same order, with default (None unless given) for keys not in the hash map.
+        All the keys are looked up by one request. Raises ValueError for a pickled value
+        unless the client allows pickles.
+        """
+        keys = list(keys)
+        response = await self._request(MGET, _LENGTH.pack(len(keys)) + b''.join(_pack_key(key) for key in keys))
+        values = DynamicArray()
+        offset = 0
+        for _ in range(len(keys)):
+            field, offset = _unpack_value(response, offset, absent=True)
+            values.append(_decode_field(field, default, self._allow_pickle))
+        return values
+
+    async def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in with one request.
+        Raises TypeError, sending nothing, for a value that is neither bytes nor a string
+        unless the client allows pickles.
+        """
+        pairs = list(pairs)
+        body = b''.join(_pack_key(key) + _pack_value(value, self._allow_pickle) for key, value in pairs)
+        await self._request(MSET, _LENGTH.pack(len(pairs)) + body)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        server = await HashMapServer(HashMap(11, hash_function_2)).start()
+        port = server.sockets[0].getsockname()[1]
+
+        print("\nput / get example")
+        print("-----------------")
+        async with await HashMapClient.connect(port=port, allow_pickle=True) as client:
+            await asyncio.gather(*(client.put('key' + str(i), i * 100) for i in range(150)))
+            print(await client.get('key5'), await client.get('key150', 'absent'))
+            print(await client.remove('key5'), await client.remove('key5'), await client.get('key5'))
+
+            print("\nput_many / get_many example")
+            print("---------------------------")
+            await client.put_many([('str', 'text'), ('bytes', b'raw'), ('list', [1, 2])])
+            values = await client.get_many(['str', 'bytes', 'list', 'missing'], -1)
+            print([values[i] for i in range(values.length())])
+
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
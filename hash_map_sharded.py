@@ -0,0 +1,365 @@
+# Description: Process-sharded Hash Map front-end. Keys are partitioned by hash across worker processes started
+# with multiprocessing, each owning an open addressing (hash_map_oa.py) or separate chaining (hash_map_sc.py) HashMap,
+# so the work of several maps runs on several cores instead of behind one interpreter lock.
+# Requests are batched per shard and pipelined: put() and remove() are buffered and sent as one message per shard
+# once BATCH_SIZE requests are waiting (or before any request whose result is needed), while put_many(),
+# get_many() and remove_many() split the keys by shard and send every shard its part before waiting for any reply.
+# Exposes the method names of the other hash maps: put(), get(), contains_key(), remove(), pop(), setdefault(),
+# update_with(), put_many(), get_many(), remove_many(), reserve(), get_keys_and_values(), clear(), get_size(),
+# get_capacity(), table_load() and empty_buckets(), plus close() (also called when used as a context manager).
+
+
+import importlib
+import multiprocessing
+import os
+
+from datastructures import DynamicArray, hash_function_1, hash_function_2, hash_keys, mix_hash
+
+# modules holding the HashMap each worker process can own
+BACKENDS = {'oa': 'hash_map_oa', 'sc': 'hash_map_sc'}
+# buffered put() and remove() requests a shard collects before they are sent
+BATCH_SIZE = 1024
+
+
+def _serve(connection, backend: str, capacity: int, function) -> None:
+    """
+    Runs in each worker process: owns one HashMap and answers batches of (method name,
+    arguments) requests with a list of (True, result) or (False, exception) replies,
+    until it receives None.
+    """
+    map = importlib.import_module(BACKENDS[backend]).HashMap(capacity, function)
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+
+        results = []
+        for name, args in batch:
+            try:
+                results.append((True, getattr(map, name)(*args)))
+            except Exception as exception:
+                results.append((False, exception))
+        connection.send(results)
+
+    connection.close()
+
+
+class ShardedHashMap:
+    """
+    Hash map whose keys are spread over shards worker processes, each with its own HashMap
+    of the backend passed in ('oa' or 'sc').
+    The hash function, and any function passed to update_with(), must be picklable
+    (defined at module level), since they are sent to the worker processes. An error
+    raised by a buffered put() or remove() is raised by the next call that waits for
+    the same shard, before that call's own request is sent.
+    """
+
+    def __init__(self,
+                 shards: int = None,
+                 backend: str = 'sc',
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize a new sharded HashMap with one worker process per shard (one per CPU
+        unless given), each starting with the capacity passed in
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {sorted(BACKENDS)}, got {backend!r}")
+
+        self._shards = shards or os.cpu_count() or 1
+        self._hash_function = function
+        self._connections = []
+        self._processes = []
+        for _ in range(self._shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(worker_connection, backend, capacity, function),
+                                              daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        # requests waiting to be sent to each shard
+        self._pending = [[] for _ in range(self._shards)]
+        # True while a shard has a batch whose reply has not been received
+        self._outstanding = [False] * self._shards
+
+    def __enter__(self) -> "ShardedHashMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Sends the buffered requests, then stops the worker processes.
+        """
+        if not self._processes:
+            return
+
+        try:
+            self._flush(range(self._shards))
+        finally:
+            for connection, process in zip(self._connections, self._processes):
+                connection.send(None)
+                process.join()
+                connection.close()
+            self._processes = []
+
+    # ------------------------------------------------------------------ #
+
+    def _shard(self, key_hash: int) -> int:
+        """
+        Returns the shard of a hash, mixed first so the shard does not follow the bucket index.
+        """
+        return mix_hash(key_hash) % self._shards
+
+    def _send(self, shard: int) -> None:
+        """
+        Sends the requests waiting for a shard as one batch. The reply to the previous batch
+        is received first, so at most one reply per shard is ever in flight and a worker is
+        never blocked writing a reply while this process is blocked writing a request.
+        """
+        if self._outstanding[shard]:
+            self._receive(shard)
+        if self._pending[shard]:
+            self._connections[shard].send(self._pending[shard])
+            self._pending[shard] = []
+            self._outstanding[shard] = True
+
+    def _receive(self, shard: int) -> list:
+        """
+        Receives the reply to the batch in flight for a shard, raising the first error in it.
+        Returns the list of results.
+        """
+        if not self._outstanding[shard]:
+            return []
+
+        self._outstanding[shard] = False
+        results = []
+        for ok, result in self._connections[shard].recv():
+            if not ok:
+                raise result
+            results.append(result)
+        return results
+
+    def _flush(self, shards) -> None:
+        """
+        Sends the requests waiting for each of the shards passed in and receives the replies,
+        raising any error, so the next request runs after all of them.
+        """
+        for shard in shards:
+            self._send(shard)
+        for shard in shards:
+            self._receive(shard)
+
+    def _buffer(self, shard: int, name: str, *args) -> None:
+        """
+        Queues a request whose result is not needed, sending the shard's batch once it is full.
+        """
+        self._pending[shard].append((name, args))
+        if len(self._pending[shard]) >= BATCH_SIZE:
+            self._send(shard)
+
+    def _call(self, shard: int, name: str, *args) -> object:
+        """
+        Sends a request, after the ones already waiting for its shard, and returns its result.
+        """
+        self._flush((shard,))
+        self._pending[shard].append((name, args))
+        self._send(shard)
+        return self._receive(shard)[-1]
+
+    def _broadcast(self, name: str, *args) -> list:
+        """
+        Sends a request to every shard, all before waiting for any reply, and returns the
+        list of results in shard order.
+        """
+        self._flush(range(self._shards))
+        for shard in range(self._shards):
+            self._pending[shard].append((name, args))
+            self._send(shard)
+        return [self._receive(shard)[-1] for shard in range(self._shards)]
+
+    def _split(self, keys: list) -> list:
+        """
+        Returns, for each shard, the list of positions in keys of the keys it owns.
+        """
+        positions = [[] for _ in range(self._shards)]
+        for position, key_hash in enumerate(hash_keys(self._hash_function, keys)):
+            positions[self._shard(key_hash)].append(position)
+        return positions
+
+    def _scatter(self, name: str, keys: list, args: tuple) -> DynamicArray:
+        """
+        Runs a batch method taking a list of keys on every shard with its part of the keys,
+        then returns the dynamic array results merged back into the order of keys.
+        """
+        positions = self._split(keys)
+        self._flush(range(self._shards))
+        for shard in range(self._shards):
+            self._pending[shard].append((name, ([keys[position] for position in positions[shard]],) + args))
+            self._send(shard)
+
+        merged = [None] * len(keys)
+        for shard in range(self._shards):
+            values = self._receive(shard)[-1]
+            for index, position in enumerate(positions[shard]):
+                merged[position] = values[index]
+        return DynamicArray(merged)
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts or updates the key (string) with the value passed in.
+        Buffered and sent with the next batch of its shard.
+        """
+        self._buffer(self._shard(self._hash_function(key)), 'put', key, value)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key passed in (string) from the hash map, if it is there.
+        Buffered and sent with the next batch of its shard.
+        """
+        self._buffer(self._shard(self._hash_function(key)), 'remove', key)
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), or default (None unless given)
+        if key is not in the hash map.
+        """
+        return self._call(self._shard(self._hash_function(key)), 'get', key, default)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the map, False otherwise.
+        """
+        return self._call(self._shard(self._hash_function(key)), 'contains_key', key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) and returns its value, or default (None unless given)
+        if key is not in the hash map.
+        """
+        return self._call(self._shard(self._hash_function(key)), 'pop', key, default)
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string), inserting value first if the key
+        is not in the hash map.
+        """
+        return self._call(self._shard(self._hash_function(key)), 'setdefault', key, value)
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map. Returns the new value.
+        """
+        return self._call(self._shard(self._hash_function(key)), 'update_with', key, function, default)
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in, sending each
+        shard its pairs as one request. The shards load their parts in parallel.
+        """
+        pairs = list(pairs)
+        positions = self._split([pair[0] for pair in pairs])
+        for shard in range(self._shards):
+            if positions[shard]:
+                self._pending[shard].append(('put_many', ([pairs[position] for position in positions[shard]],)))
+                self._send(shard)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        return self._scatter('get_many', list(keys), (default,))
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        return self._scatter('remove_many', list(keys), (default,))
+
+    def reserve(self, count: int) -> None:
+        """
+        Sizes every shard once for its share of count elements.
+        """
+        self._broadcast('reserve', count // self._shards + 1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element of every shard.
+        """
+        keys_vals = DynamicArray()
+        for shard_keys_vals in self._broadcast('get_keys_and_values'):
+            for index in range(shard_keys_vals.length()):
+                keys_vals.append(shard_keys_vals[index])
+        return keys_vals
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from every shard.
+        """
+        self._broadcast('clear')
+
+    def get_size(self) -> int:
+        """
+        Return size of map, the total over the shards
+        """
+        return sum(self._broadcast('get_size'))
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, the total over the shards
+        """
+        return sum(self._broadcast('get_capacity'))
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor over all shards, the average number of elements per bucket.
+        """
+        return self.get_size() / self.get_capacity()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of empty buckets over all shards.
+        """
+        return sum(self._broadcast('empty_buckets'))
+
+
+def _increment(count: int) -> int:
+    """
+    Returns count + 1. Used by the update_with() example below; it is defined at module
+    level because update_with() pickles the function by reference to send it to the shard,
+    and a worker started with the 'spawn' method cannot find one defined under __main__.
+    """
+    return count + 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get example")
+    print("-----------------")
+    with ShardedHashMap(4, 'sc', 11, hash_function_1) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        print(m.get_size(), m.get_capacity(), m.get('str42'), m.contains_key('str150'))
+        m.remove('str42')
+        print(m.get_size(), m.get('str42'), m.pop('str43'), m.pop('str43', 'absent'))
+
+    print("\nput_many / get_many example")
+    print("---------------------------")
+    with ShardedHashMap(3, 'oa', 11, hash_function_2) as m:
+        m.put_many(('key' + str(i), i) for i in range(1000))
+        values = m.get_many(['key5', 'key999', 'missing'], -1)
+        print(m.get_size(), [values[i] for i in range(values.length())])
+        for i in range(5):
+            m.update_with('count', _increment, 0)
+        print(m.get('count'), m.remove_many(['key1', 'key2', 'key1']).length(), m.get_size())
@@ -0,0 +1,541 @@
+# Description: Implementation of a Hash Map with Open Addressing laid out in multiprocessing.shared_memory, so
+# several processes can read the same table without each holding a private copy built from Python objects.
+# The table lives in a data segment: a header, a fixed-width slot per index (cached hash, blob offset, key and value
+# lengths, state and value type) and a blob region holding each key (UTF-8) followed by its value (bytes, UTF-8 text,
+# or a pickle for any other object). Collisions are resolved with Tombstones and Quadratic Probing, with the same
+# 0.5 load factor as hash_map_oa.py. Lookups compare the key bytes in place, so get() and contains_key() copy or
+# decode nothing but the value being returned.
+# A single writer process (SharedHashMap) changes the table; other processes attach a read-only SharedHashMapView by
+# name. The writer publishes with two version counters: the data segment version is odd while a slot is being
+# changed, and readers retry a lookup that overlapped a change; when the table or the blob is full, the writer
+# builds a complete new data segment and publishes its name in a small control segment under a generation counter,
+# which readers check on every call and follow.
+# SharedHashMapView has get(), contains_key(), get_size(), get_capacity(), table_load(), get_keys_and_values(),
+# __iter__() and close(); SharedHashMap adds put(), remove(), pop(), clear() and unlink().
+
+
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+from datastructures import (DynamicArray, decode_value, encode_value, hash_function_1, hash_function_2,
+                            next_prime_capacity)
+from hash_map_oa import MAX_LOAD_FACTOR
+
+# states of a slot
+EMPTY = 0
+ACTIVE = 1
+TOMBSTONE = 2
+
+# blob bytes reserved for keys and values when a table is created
+BLOB_SIZE = 1 << 20
+
+# cached hashes are kept to 64 bits so they fit a slot
+_MASK_64 = (1 << 64) - 1
+
+_MAGIC = b'HMSHM001'
+# control segment: magic, generation (odd while a new data segment is being published), data segment name
+_CONTROL = struct.Struct('<8sQ64s')
+_GENERATION_OFFSET = 8
+# data segment header: version (odd while the table is being changed), capacity, size, tombstones,
+# blob bytes used and blob size, padded to 64 bytes
+_HEADER = struct.Struct('<QQQQQQ16x')
+# counter at the start of the control segment generation and the data segment header
+_COUNTER = struct.Struct('<Q')
+# slot: hash, blob offset of the key (its value follows it), key length, value length, state, value type
+_SLOT = struct.Struct('<QQIIBB6x')
+
+
+def _create(size: int, name: str = None) -> shared_memory.SharedMemory:
+    """
+    Creates a shared memory segment that the resource tracker does not remove on its own,
+    since readers in other processes may outlive this one. unlink() removes it.
+    """
+    try:
+        return shared_memory.SharedMemory(name, create=True, size=size, track=False)
+    except TypeError:
+        # before Python 3.13 every segment is registered with the resource tracker
+        segment = shared_memory.SharedMemory(name, create=True, size=size)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing shared memory segment without registering it with the resource tracker.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _destroy(segment: shared_memory.SharedMemory) -> None:
+    """
+    Closes and removes a segment made by _create().
+    """
+    segment.close()
+    if not hasattr(segment, '_track'):
+        # before Python 3.13 unlink() also unregisters the segment, so register it again first
+        resource_tracker.register(segment._name, 'shared_memory')
+    segment.unlink()
+
+
+class SharedHashMapView:
+    """
+    Read-only view of a SharedHashMap, attached by name from any process.
+    The hash function must be the same one the writer uses.
+    """
+
+    def __init__(self, name: str, function=hash_function_1) -> None:
+        """
+        Attach to the SharedHashMap with the name passed in
+        """
+        self._hash_function = function
+        self._control = _attach(name)
+        if _CONTROL.unpack_from(self._control.buf)[0] != _MAGIC:
+            self._control.close()
+            raise ValueError(f"{name!r} is not a SharedHashMap")
+
+        self._data = None
+        self._generation = None
+        self._refresh()
+
+    def __enter__(self) -> "SharedHashMapView":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        """
+        Name other processes attach to
+        """
+        return self._control.name
+
+    def close(self) -> None:
+        """
+        Detaches from the shared memory, which stays available to the other processes.
+        """
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._control.close()
+
+    def _refresh(self) -> None:
+        """
+        Attaches to the current data segment if the writer has published a new one since the last call.
+        """
+        while True:
+            generation = _COUNTER.unpack_from(self._control.buf, _GENERATION_OFFSET)[0]
+            if generation == self._generation:
+                return
+            if generation % 2:
+                continue
+
+            name = _CONTROL.unpack_from(self._control.buf)[2].rstrip(b'\0').decode()
+            if _COUNTER.unpack_from(self._control.buf, _GENERATION_OFFSET)[0] != generation:
+                continue
+            try:
+                data = _attach(name)
+            except FileNotFoundError:
+                # replaced and removed again before it could be attached
+                continue
+
+            if self._data is not None:
+                self._data.close()
+            self._data = data
+            self._generation = generation
+
+    def _read(self, function) -> object:
+        """
+        Returns function(buffer) run on the current data segment, retrying until it runs
+        without the writer changing the table at the same time.
+        """
+        while True:
+            self._refresh()
+            buffer = self._data.buf
+            version = _COUNTER.unpack_from(buffer)[0]
+            if version % 2:
+                continue
+
+            try:
+                result = function(buffer)
+            except (IndexError, ValueError, struct.error):
+                # offsets read halfway through a change, retried below
+                if _COUNTER.unpack_from(buffer)[0] == version:
+                    raise
+                continue
+
+            if _COUNTER.unpack_from(buffer)[0] == version:
+                return result
+
+    @staticmethod
+    def _lookup(buffer: memoryview, key: bytes, key_hash: int) -> tuple:
+        """
+        Runs the quadratic probe sequence for the key bytes and returns the (index, offset,
+        key length, value length, value type) of its slot, or None if the key is not in the table.
+        """
+        capacity = _HEADER.unpack_from(buffer)[1]
+        blob = _HEADER.size + capacity * _SLOT.size
+        initial_index = key_hash % capacity
+        index = initial_index
+        step = 1
+        while step <= capacity:
+            slot_hash, offset, key_length, value_length, state, value_type = \
+                _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)
+            if state == EMPTY:
+                return None
+            if (state == ACTIVE and slot_hash == key_hash and key_length == len(key) and
+                    buffer[blob + offset:blob + offset + key_length] == key):
+                return index, offset, key_length, value_length, value_type
+
+            index = (initial_index + (step ** 2)) % capacity
+            step += 1
+
+        return None
+
+    def _value(self, slot: tuple) -> object:
+        """
+        Decodes the value of a slot found by _lookup(). Blob bytes are never overwritten,
+        so this needs no version check.
+        """
+        index, offset, key_length, value_length, value_type = slot
+        buffer = self._data.buf
+        start = _HEADER.size + _HEADER.unpack_from(buffer)[1] * _SLOT.size + offset + key_length
+        return decode_value(value_type, buffer[start:start + value_length])
+
+    # ------------------------------------------------------------------ #
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        key_bytes = key.encode()
+        key_hash = self._hash_function(key) & _MASK_64
+        slot = self._read(lambda buffer: self._lookup(buffer, key_bytes, key_hash))
+        return default if slot is None else self._value(slot)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if key (string) is in the map, False otherwise.
+        """
+        key_bytes = key.encode()
+        key_hash = self._hash_function(key) & _MASK_64
+        return self._read(lambda buffer: self._lookup(buffer, key_bytes, key_hash)) is not None
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._read(lambda buffer: _HEADER.unpack_from(buffer)[2])
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._read(lambda buffer: _HEADER.unpack_from(buffer)[1])
+
+    def table_load(self) -> float:
+        """
+        Returns the table load factor, the average number of elements per index.
+        """
+        capacity, size = self._read(lambda buffer: _HEADER.unpack_from(buffer)[1:3])
+        return size / capacity
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array with a (key, value) tuple for each element, all read from
+        the same version of the table.
+        """
+        def scan(buffer: memoryview) -> list:
+            capacity = _HEADER.unpack_from(buffer)[1]
+            slots = []
+            for index in range(capacity):
+                slot_hash, offset, key_length, value_length, state, value_type = \
+                    _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)
+                if state == ACTIVE:
+                    slots.append((index, offset, key_length, value_length, value_type))
+            return slots
+
+        keys_vals = DynamicArray()
+        slots = self._read(scan)
+        buffer = self._data.buf
+        blob = _HEADER.size + _HEADER.unpack_from(buffer)[1] * _SLOT.size
+        for slot in slots:
+            index, offset, key_length, value_length, value_type = slot
+            key = str(buffer[blob + offset:blob + offset + key_length], 'utf-8')
+            keys_vals.append((key, self._value(slot)))
+        return keys_vals
+
+    def __iter__(self):
+        """
+        Returns an iterator over (key, value) tuples of one version of the table.
+        """
+        keys_vals = self.get_keys_and_values()
+        return iter([keys_vals[index] for index in range(keys_vals.length())])
+
+
+class SharedHashMap(SharedHashMapView):
+    """
+    Writer of a hash map in shared memory. Only one process, and one thread in it, may
+    write; any number of processes can attach a SharedHashMapView by name to read.
+    Updates write the new key and value to unused blob bytes first and then change the
+    slot and header while the version is odd. A full table or blob is rebuilt into a new
+    data segment, which is then published through the control segment.
+    """
+
+    def __init__(self, capacity: int = 11, function=hash_function_1, blob_size: int = BLOB_SIZE,
+                 name: str = None) -> None:
+        """
+        Initialize new shared HashMap, under the name passed in or a generated one
+        """
+        self._hash_function = function
+        self._control = _create(_CONTROL.size, name)
+        _CONTROL.pack_into(self._control.buf, 0, _MAGIC, 0, b'')
+        self._generation = 0
+        self._data = None
+        self._min_capacity = next_prime_capacity(capacity)
+        self._min_blob_size = blob_size
+        self._publish(self._allocate(self._min_capacity, blob_size))
+
+    def __exit__(self, *exc_info) -> None:
+        self.unlink()
+
+    def unlink(self) -> None:
+        """
+        Removes the shared memory. Readers still attached keep their mapping until they close it.
+        close() detaches the writer without removing it, leaving it to the readers.
+        """
+        if self._data is not None:
+            _destroy(self._data)
+            self._data = None
+        _destroy(self._control)
+
+    def _refresh(self) -> None:
+        """
+        The writer always holds the current data segment.
+        """
+
+    def _read(self, function) -> object:
+        """
+        Returns function(buffer) run on the current data segment; the writer cannot race itself.
+        """
+        return function(self._data.buf)
+
+    @staticmethod
+    def _allocate(capacity: int, blob_size: int) -> shared_memory.SharedMemory:
+        """
+        Creates a data segment with capacity empty slots and blob_size blob bytes.
+        """
+        data = _create(_HEADER.size + capacity * _SLOT.size + blob_size)
+        # new segments are zero-filled, so every slot starts EMPTY
+        _HEADER.pack_into(data.buf, 0, 0, capacity, 0, 0, 0, blob_size)
+        return data
+
+    def _publish(self, data: shared_memory.SharedMemory) -> None:
+        """
+        Makes a completely built data segment current: the generation is odd while the
+        name is written, and the old segment is removed afterwards.
+        """
+        buffer = self._control.buf
+        name = data.name.encode()
+        _COUNTER.pack_into(buffer, _GENERATION_OFFSET, self._generation + 1)
+        _CONTROL.pack_into(buffer, 0, _MAGIC, self._generation + 1, name)
+        self._generation += 2
+        _COUNTER.pack_into(buffer, _GENERATION_OFFSET, self._generation)
+
+        old, self._data = self._data, data
+        if old is not None:
+            _destroy(old)
+
+    def _find_slot(self, key: bytes, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the quadratic probe sequence for the key bytes once. Returns (index, True) for
+        the slot holding the key, otherwise (index, False) for the slot it should be inserted
+        at: the first Tombstone passed on the way, or the empty slot that ended the probe.
+        """
+        buffer = self._data.buf
+        capacity = _HEADER.unpack_from(buffer)[1]
+        blob = _HEADER.size + capacity * _SLOT.size
+        initial_index = key_hash % capacity
+        index = initial_index
+        step = 1
+        tombstone_index = None
+        while True:
+            slot_hash, offset, key_length, value_length, state, value_type = \
+                _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)
+            if state == EMPTY:
+                break
+            if state == TOMBSTONE:
+                if tombstone_index is None:
+                    tombstone_index = index
+            elif (slot_hash == key_hash and key_length == len(key) and
+                    buffer[blob + offset:blob + offset + key_length] == key):
+                return index, True
+
+            index = (initial_index + (step ** 2)) % capacity
+            step += 1
+
+        if tombstone_index is not None:
+            return tombstone_index, False
+        return index, False
+
+    def _rebuild(self, capacity: int, blob_size: int) -> None:
+        """
+        Copies every active element, key and value bytes included, into a new data segment
+        of the capacity and blob size passed in (capacity rounded up to a prime), dropping
+        Tombstones and the blob bytes of replaced values, then publishes it.
+        """
+        old = self._data.buf
+        old_capacity = _HEADER.unpack_from(old)[1]
+        old_blob = _HEADER.size + old_capacity * _SLOT.size
+
+        capacity = next_prime_capacity(capacity)
+        data = self._allocate(capacity, blob_size)
+        buffer = data.buf
+        blob = _HEADER.size + capacity * _SLOT.size
+        size = 0
+        used = 0
+        for old_index in range(old_capacity):
+            slot_hash, offset, key_length, value_length, state, value_type = \
+                _SLOT.unpack_from(old, _HEADER.size + old_index * _SLOT.size)
+            if state != ACTIVE:
+                continue
+
+            length = key_length + value_length
+            buffer[blob + used:blob + used + length] = old[old_blob + offset:old_blob + offset + length]
+
+            initial_index = slot_hash % capacity
+            index = initial_index
+            step = 1
+            while _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)[4] != EMPTY:
+                index = (initial_index + (step ** 2)) % capacity
+                step += 1
+            _SLOT.pack_into(buffer, _HEADER.size + index * _SLOT.size,
+                            slot_hash, used, key_length, value_length, ACTIVE, value_type)
+            size += 1
+            used += length
+
+        _HEADER.pack_into(buffer, 0, 0, capacity, size, 0, used, blob_size)
+        self._publish(data)
+
+    def _make_room(self, inserting: bool, length: int) -> None:
+        """
+        Rebuilds the table ahead of writing length blob bytes and, if inserting, one more slot,
+        when the load factor counting Tombstones would pass 0.5 or the blob would overflow.
+        The capacity doubles when the active elements alone need it, and the blob grows to
+        twice the bytes of the active elements and the new one.
+        """
+        version, capacity, size, tombstones, used, blob_size = _HEADER.unpack_from(self._data.buf)
+        if used + length <= blob_size and not (inserting and size + tombstones + 1 > MAX_LOAD_FACTOR * capacity):
+            return
+
+        if size + 1 > MAX_LOAD_FACTOR * capacity:
+            capacity = 2 * capacity
+
+        self._rebuild(capacity, blob_size)
+        used = _HEADER.unpack_from(self._data.buf)[4]
+        if used + length > blob_size:
+            self._rebuild(capacity, max(self._min_blob_size, 2 * (used + length)))
+
+    def _write(self, index: int, slot: tuple, size: int, tombstones: int, used: int) -> None:
+        """
+        Writes a slot and the header counters with the version odd for the duration.
+        """
+        buffer = self._data.buf
+        version, capacity, old_size, old_tombstones, old_used, blob_size = _HEADER.unpack_from(buffer)
+        _COUNTER.pack_into(buffer, 0, version + 1)
+        _SLOT.pack_into(buffer, _HEADER.size + index * _SLOT.size, *slot)
+        _HEADER.pack_into(buffer, 0, version + 1, capacity, size, tombstones, used, blob_size)
+        _COUNTER.pack_into(buffer, 0, version + 2)
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts a new element into the hash map if the key is not in the hash map.
+        If the key is in the hash map, updates the key with new value.
+        The key and value bytes are written to unused blob bytes before the slot points to them.
+        """
+        key_bytes = key.encode()
+        value_type, value_bytes = encode_value(value)
+        key_hash = self._hash_function(key) & _MASK_64
+
+        index, found = self._find_slot(key_bytes, key_hash)
+        generation = self._generation
+        self._make_room(not found, len(key_bytes) + len(value_bytes))
+        if self._generation != generation:
+            index, found = self._find_slot(key_bytes, key_hash)
+
+        buffer = self._data.buf
+        version, capacity, size, tombstones, used, blob_size = _HEADER.unpack_from(buffer)
+        blob = _HEADER.size + capacity * _SLOT.size
+        buffer[blob + used:blob + used + len(key_bytes)] = key_bytes
+        buffer[blob + used + len(key_bytes):blob + used + len(key_bytes) + len(value_bytes)] = value_bytes
+
+        if not found:
+            if _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)[4] == TOMBSTONE:
+                tombstones -= 1
+            size += 1
+        slot = (key_hash, used, len(key_bytes), len(value_bytes), ACTIVE, value_type)
+        self._write(index, slot, size, tombstones, used + len(key_bytes) + len(value_bytes))
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map and returns its value,
+        or default (None unless given) if key is not in the hash map.
+        """
+        key_hash = self._hash_function(key) & _MASK_64
+        slot = self._lookup(self._data.buf, key.encode(), key_hash)
+        if slot is None:
+            return default
+
+        value = self._value(slot)
+        buffer = self._data.buf
+        index = slot[0]
+        version, capacity, size, tombstones, used, blob_size = _HEADER.unpack_from(buffer)
+        slot_fields = _SLOT.unpack_from(buffer, _HEADER.size + index * _SLOT.size)
+        self._write(index, slot_fields[:4] + (TOMBSTONE,) + slot_fields[5:], size - 1, tombstones + 1, used)
+        return value
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key passed in (string) from the hash map, leaving a Tombstone.
+        """
+        self.pop(key)
+
+    def clear(self) -> None:
+        """
+        Publishes a new, empty table at the initial capacity and blob size.
+        """
+        self._publish(self._allocate(self._min_capacity, self._min_blob_size))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    def read_in_child(name: str) -> None:
+        with SharedHashMapView(name, hash_function_2) as view:
+            print('child', view.get_size(), view.get('key5'), view.get('key7'), view.contains_key('key150'))
+
+    print("\nput / get example")
+    print("-----------------")
+    with SharedHashMap(11, hash_function_2, blob_size=256) as m:
+        for i in range(100):
+            m.put('key' + str(i), i * 100 if i % 2 else 'value' + str(i))
+        print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.get('key5'), m.get('key6'))
+        m.remove('key7')
+        m.put('key5', b'bytes')
+        print(m.get_size(), m.get('key7'), m.get('key5'), m.pop('key8'), m.pop('key8', 'absent'))
+
+        print("\nreader process example")
+        print("----------------------")
+        process = multiprocessing.Process(target=read_in_child, args=(m.name,))
+        process.start()
+        process.join()
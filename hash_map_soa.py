@@ -0,0 +1,461 @@
+# Description: Implementation of a Hash Map with Open Addressing that stores its table as parallel arrays
+# (struct of arrays) instead of one HashEntry object per index: a list of keys, a list of values, an unsigned 64-bit
+# array of cached hashes and a byte array holding the state of each index (empty, active or Tombstone).
+# An active element costs four array slots (about 25 bytes) instead of a HashEntry object with its own instance
+# dictionary, and probing reads the state and hash arrays without following a pointer per index.
+# Collisions are resolved with Tombstones and Quadratic Probing, with the same load accounting as hash_map_oa.py.
+# Has the same methods as the hash map in hash_map_oa.py: put() (insert key/value), resize_table(), table_load(),
+# empty_buckets(), get(), contains_key(), remove(), pop(), setdefault(), update_with(), put_many(), get_many(),
+# remove_many(), reserve(), compact(), get_keys_and_values(), clear(), __iter__() and __next__(). Iteration returns
+# (key, value) tuples instead of HashEntry objects.
+
+
+from array import array
+
+from datastructures import (DynamicArray, hash_function_1, hash_function_2, hash_keys,
+                            next_prime_capacity)
+
+# states of an index in the state byte array
+EMPTY = 0
+ACTIVE = 1
+TOMBSTONE = 2
+
+# cached hashes are kept to 64 bits so they fit the hash array
+_MASK_64 = (1 << 64) - 1
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        quadratic probing for collision resolution
+        """
+        # capacity must be a prime number
+        self._capacity = next_prime_capacity(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = function
+        self._size = 0
+        self._tombstones = 0
+
+    @classmethod
+    def with_expected_size(cls, count: int, function=hash_function_1) -> "HashMap":
+        """
+        Returns a new HashMap with capacity for count elements below the 0.5 load factor.
+        """
+        return cls(2 * count + 1, function)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._states[i] == EMPTY:
+                out += str(i) + ': None\n'
+            else:
+                out += (str(i) + ': K: ' + str(self._keys[i]) + ' V: ' + str(self._values[i]) +
+                        ' TS: ' + str(self._states[i] == TOMBSTONE) + '\n')
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Creates empty parallel arrays for a table of the given capacity.
+        """
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._states = bytearray(capacity)
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the hash of the key, kept to 64 bits so it fits the hash array.
+        """
+        return self._hash_function(key) & _MASK_64
+
+    def _hash_many(self, keys: list) -> list:
+        """
+        Returns the hashes of a list of keys, hashing them together with hash_keys().
+        """
+        return [key_hash & _MASK_64 for key_hash in hash_keys(self._hash_function, keys)]
+
+    def _find_slot(self, key: str, key_hash: int) -> tuple[int, bool]:
+        """
+        Runs the quadratic probe sequence for the key once.
+        Returns (index, True) for the index holding the active key, otherwise (index, False)
+        for the index the key should be inserted at: the first Tombstone passed on the way,
+        or the empty index that ended the probe.
+        """
+        states, hashes, keys = self._states, self._hashes, self._keys
+        initial_index = key_hash % self._capacity
+        new_index = initial_index
+        step = 1
+        tombstone_index = None
+
+        while states[new_index] != EMPTY:
+            if states[new_index] == TOMBSTONE:
+                if tombstone_index is None:
+                    tombstone_index = new_index
+            elif hashes[new_index] == key_hash and keys[new_index] == key:
+                return new_index, True
+
+            # quadratic probing for next available index
+            new_index = (initial_index + (step ** 2)) % self._capacity
+            step += 1
+            # the load invariant leaves an empty index on every probe sequence
+            assert step <= self._capacity, "probe sequence without an empty index"
+
+        if tombstone_index is not None:
+            return tombstone_index, False
+        return new_index, False
+
+    def _insert_at(self, index: int, key: str, key_hash: int, value: object) -> None:
+        """
+        Stores a new active element at an index returned by _find_slot(), reusing the
+        Tombstone there if there is one.
+        """
+        if self._states[index] == TOMBSTONE:
+            self._tombstones -= 1
+        self._size += 1
+        self._keys[index] = key
+        self._values[index] = value
+        self._hashes[index] = key_hash
+        self._states[index] = ACTIVE
+
+    def _remove_at(self, index: int) -> object:
+        """
+        Turns the active element at an index returned by _find_slot() into a Tombstone
+        and returns its value. The key and value references are dropped right away.
+        """
+        value = self._values[index]
+        self._keys[index] = None
+        self._values[index] = None
+        self._states[index] = TOMBSTONE
+        self._size -= 1
+        self._tombstones += 1
+        return value
+
+    def _make_room(self) -> None:
+        """
+        Keeps the load factor, counting Tombstones, at most 0.5 after a possible insertion, so
+        at most (capacity - 1) / 2 indices are taken and every probe sequence, which reaches
+        (capacity + 1) / 2 of them, ends on an empty one.
+        Rebuilds the table at the same capacity when Tombstones dominate, else doubles it.
+        """
+        if self._size + self._tombstones + 1 > 0.5 * self._capacity:
+            if self._tombstones >= self._size and self._size + 1 <= 0.5 * self._capacity:
+                self.compact()
+            else:
+                self.resize_table(2 * self._capacity)
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Inserts a new element into the hash map if the key is not in the hash map.
+        If the key is in the hash map, updates the key with new value.
+        Maintains table load factor, counting Tombstones, of at most 0.5 by resizing the table
+        with resize_table(), or by compacting it in place when Tombstones dominate.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+
+        if found:
+            self._values[index] = value
+        else:
+            self._insert_at(index, key, key_hash, value)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash map to the closest prime number at or above the new capacity,
+        doubling it further while the table would be above the 0.5 load factor.
+        Copies the active elements into new parallel arrays from their cached hash in a single pass.
+        """
+        if new_capacity < self._size:
+            return
+
+        new_capacity = next_prime_capacity(new_capacity)
+        while self._size > 0.5 * new_capacity:
+            new_capacity = next_prime_capacity(2 * new_capacity)
+
+        old_keys, old_values, old_hashes, old_states = self._keys, self._values, self._hashes, self._states
+        self._allocate(new_capacity)
+        states = self._states
+
+        for index in range(len(old_states)):
+            # only copy active elements, ignore Tombstones
+            if old_states[index] != ACTIVE:
+                continue
+
+            key_hash = old_hashes[index]
+            initial_index = key_hash % new_capacity
+            new_index = initial_index
+            step = 1
+            while states[new_index] != EMPTY:
+                new_index = (initial_index + (step ** 2)) % new_capacity
+                step += 1
+                assert step <= new_capacity, "probe sequence without an empty index"
+
+            self._keys[new_index] = old_keys[index]
+            self._values[new_index] = old_values[index]
+            self._hashes[new_index] = key_hash
+            states[new_index] = ACTIVE
+
+        self._capacity = new_capacity
+        self._tombstones = 0
+
+    def compact(self) -> None:
+        """
+        Rebuilds the hash map in place at its current capacity, dropping every Tombstone.
+        """
+        self.resize_table(self._capacity)
+
+    def table_load(self) -> float:
+        """
+        Calculates the table load factor, the average number of elements per bucket.
+        Returns a float value containing the table load factor.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number (integer) of buckets that are either empty or a Tombstone.
+        """
+        return self._capacity - self._size
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Retrieves and returns the value (object) that corresponds with the key (string) passed in.
+        Returns default (None unless given) if key is not in the hash map.
+        """
+        index, found = self._find_slot(key, self._hash(key))
+        if found:
+            return self._values[index]
+        return default
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Probes for the key (string) passed in once to determine if it is in the hash map.
+        Returns True if key is in the map, False otherwise.
+        """
+        if self._size == 0:
+            return False
+
+        return self._find_slot(key, self._hash(key))[1]
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key passed in (string) from the hash map, decreases the map's size by 1.
+        The index becomes a Tombstone.
+        """
+        self.pop(key)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the key passed in (string) from the hash map with a single probe and returns
+        its value, or default (None unless given) if key is not in the hash map.
+        """
+        index, found = self._find_slot(key, self._hash(key))
+        if not found:
+            return default
+        return self._remove_at(index)
+
+    def setdefault(self, key: str, value: object = None) -> object:
+        """
+        Returns the value of the key passed in (string) if it is in the hash map.
+        Otherwise inserts the key with the value passed in and returns that value.
+        Hashes and probes for the key once.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+        if found:
+            return self._values[index]
+
+        self._insert_at(index, key, key_hash, value)
+        return value
+
+    def update_with(self, key: str, function, default: object = None) -> object:
+        """
+        Replaces the value of the key passed in (string) with function(value), inserting
+        function(default) if the key is not in the hash map.
+        Hashes and probes for the key once, and returns the new value.
+        """
+        key_hash = self._hash(key)
+        self._make_room()
+        index, found = self._find_slot(key, key_hash)
+        if found:
+            self._values[index] = function(self._values[index])
+            return self._values[index]
+
+        value = function(default)
+        self._insert_at(index, key, key_hash, value)
+        return value
+
+    def put_many(self, pairs) -> None:
+        """
+        Inserts or updates every (key, value) pair of the iterable passed in.
+        The keys are hashed together and the table is sized once for the keys that are new.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        key_hashes = self._hash_many(keys)
+        if self._size:
+            # the keys already in the map are updated in place first, so the table is sized
+            # for the new keys only; every pair of a new key is kept, in order, for below
+            new_pairs = []
+            for (key, value), key_hash in zip(pairs, key_hashes):
+                index, found = self._find_slot(key, key_hash)
+                if found:
+                    self._values[index] = value
+                else:
+                    new_pairs.append(((key, value), key_hash))
+            new_keys = {key for (key, value), key_hash in new_pairs}
+        else:
+            # in an empty map every key is new
+            new_pairs = zip(pairs, key_hashes)
+            new_keys = set(keys)
+
+        self.reserve(self._size + len(new_keys))
+        for (key, value), key_hash in new_pairs:
+            index, found = self._find_slot(key, key_hash)
+            if found:
+                self._values[index] = value
+            else:
+                self._insert_at(index, key, key_hash, value)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of the iterable passed in,
+        in the same order, with default (None unless given) for keys not in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            index, found = self._find_slot(key, key_hash)
+            values.append(self._values[index] if found else default)
+        return values
+
+    def remove_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Removes each key of the iterable passed in and returns a dynamic array with the
+        removed values, in the same order, with default (None unless given) for keys not
+        in the hash map.
+        """
+        keys = list(keys)
+        values = DynamicArray()
+        for key, key_hash in zip(keys, self._hash_many(keys)):
+            index, found = self._find_slot(key, key_hash)
+            values.append(self._remove_at(index) if found else default)
+        return values
+
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once so that count elements fit within the 0.5 load factor,
+        counting the Tombstones currently in the table (the resize drops them).
+        """
+        if self._tombstones + count > 0.5 * self._capacity:
+            self.resize_table(2 * count + 1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Retrieves the keys and values of each element in the hash map and
+        returns a dynamic array with a tuple at each index (key, value).
+        Order does not matter.
+        """
+        keys_vals = DynamicArray()
+        for index in range(self._capacity):
+            if self._states[index] == ACTIVE:
+                keys_vals.append((self._keys[index], self._values[index]))
+        return keys_vals
+
+    def clear(self) -> None:
+        """
+        Deletes all elements from the hash map, emptying every index.
+        Size becomes 0, but underlying capacity remains the same.
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+        self._tombstones = 0
+
+    def __iter__(self):
+        """
+        Enables iteration (for i in map) and initializes an index variable to track
+        each index in the map.
+        """
+        self._index = 0
+        return self
+
+    def __next__(self) -> tuple:
+        """
+        Returns the next active element as a (key, value) tuple.
+        Stops iteration once every index has been visited.
+        """
+        # finds the next active index with a search of the state byte array
+        index = self._states.find(ACTIVE, self._index)
+        if index == -1:
+            raise StopIteration
+
+        self._index = index + 1
+        return self._keys[index], self._values[index]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nresize example")
+    print("--------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for key, value in m:
+        print('K:', key, 'V:', value)